@@ -39,21 +39,55 @@ class BugNN:
             return pickle.load(file)
 
     @staticmethod
-    def random_weights_from_layer_desc(layer_desc):
+    def activation_from_name(name):
+        return BugNN.relu if name == "relu" else BugNN.sigmoid
+
+    @staticmethod
+    def random_weights_from_layer_desc(layer_desc, rng):
         num_in, num_out = layer_desc["inputs"], layer_desc["outputs"]
-        activation = BugNN.relu if layer_desc["activation"] == "relu" else BugNN.sigmoid
-        weight_matrix = 2 * np.random.random((num_out, num_in)) - 1
-        bias_matrix = np.random.random(num_out)
+        activation = BugNN.activation_from_name(layer_desc["activation"])
+        weight_matrix = 2 * rng.random((num_out, num_in)) - 1
+        bias_matrix = rng.random(num_out)
         layer = Layer(num_in, num_out, activation,
                       weight_matrix.astype(dtype=np.float32),
                       bias_matrix.astype(dtype=np.float32))
         return layer
 
-    def __init__(self, action_dict=None, architecture=None, seed=22):
+    @staticmethod
+    def layers_from_brain_genome(brain_genome, architecture):
+        """
+        Builds layers whose weights and biases are views onto brain_genome, nothing is copied
+        :np.ndarray brain_genome: Weights of every layer followed by biases of every layer
+        :[dict] architecture: Layer descriptions of brain
+        :return: List of Layer
+        """
+        layers, curr_index = [], 0
+        for layer_desc in architecture:
+            num_in, num_out = layer_desc["inputs"], layer_desc["outputs"]
+            weights = brain_genome[curr_index:curr_index+num_in*num_out].reshape((num_out, num_in))
+            curr_index += num_in * num_out
+            layers.append(Layer(num_in, num_out, BugNN.activation_from_name(layer_desc["activation"]),
+                                weights, None))
+        for layer in layers:
+            layer.biases = brain_genome[curr_index:curr_index+layer.num_outputs]
+            curr_index += layer.num_outputs
+        return layers
+
+    def __init__(self, action_dict=None, architecture=None, seed=22, brain_genome=None, rng=None):
+        """
+        :dict action_dict: Names of actions
+        :[dict] architecture: Layer descriptions of brain
+        :int seed: Seed of random weights, unused if brain_genome or rng is given
+        :np.ndarray brain_genome: Genes to use as weights and biases directly (e.g. BugGenome.get_brain_genes)
+        :np.random.Generator rng: Stream to draw random weights from
+        """
         self.action_dict = action_dict if action_dict is not None else BugNN.action_dict
         self.architecture = architecture if architecture is not None else BugNN.architecture
-        np.random.seed(seed)
-        self.layers = [BugNN.random_weights_from_layer_desc(layer_desc)
+        if brain_genome is not None:
+            self.layers = BugNN.layers_from_brain_genome(brain_genome, self.architecture)
+            return
+        rng = rng if rng is not None else np.random.default_rng(seed)
+        self.layers = [BugNN.random_weights_from_layer_desc(layer_desc, rng)
                        for layer_desc in self.architecture]
 
     def forward(self, inputs):
@@ -94,3 +128,85 @@ class BugNN:
     def save(self, filepath):
         with open(filepath, 'wb') as file:
             pickle.dump(self, file)
+
+
+class BatchedBugNN:
+    """
+    Brains of a whole population evaluated together.
+    Weights of every brain sharing one architecture are stacked into (N, outputs, inputs) tensors,
+    so a forward pass is one matmul per layer instead of one per layer per bug.
+    """
+    @classmethod
+    def from_brains(cls, brains):
+        """
+        :[BugNN] brains: Brains to stack, all must share the same architecture
+        :return: BatchedBugNN evaluating all brains at once
+        """
+        architecture = brains[0].architecture
+        for brain in brains:
+            if brain.architecture != architecture:
+                raise Exception("All brains in a BatchedBugNN must share the same architecture.")
+        weights = [np.stack([brain.layers[i].weights for brain in brains])
+                   for i in range(len(architecture))]
+        biases = [np.stack([brain.layers[i].biases for brain in brains])
+                  for i in range(len(architecture))]
+        return cls(architecture, weights, biases)
+
+    @classmethod
+    def from_brain_genomes(cls, brain_genomes, architecture):
+        """
+        :brain_genomes: (N, genes) array or list of brain genomes, all weights followed by all biases
+        :[dict] architecture: Layer descriptions shared by every brain
+        :return: BatchedBugNN evaluating all brains at once
+        """
+        brain_matrix = np.asarray(brain_genomes)
+        num_brains = brain_matrix.shape[0]
+        weights, biases = [], []
+        curr_index = 0
+        for layer_desc in architecture:
+            num_weights = layer_desc["outputs"] * layer_desc["inputs"]
+            weights.append(brain_matrix[:, curr_index:curr_index+num_weights]
+                           .reshape(num_brains, layer_desc["outputs"], layer_desc["inputs"]))
+            curr_index += num_weights
+        for layer_desc in architecture:
+            biases.append(brain_matrix[:, curr_index:curr_index+layer_desc["outputs"]])
+            curr_index += layer_desc["outputs"]
+        return cls(architecture, weights, biases)
+
+    def __init__(self, architecture, weights, biases):
+        """
+        :[dict] architecture: Layer descriptions shared by every brain
+        :[np.ndarray] weights: (N, outputs, inputs) weight tensor of each layer
+        :[np.ndarray] biases: (N, outputs) bias matrix of each layer
+        """
+        self.architecture = architecture
+        self.layers = [Layer(layer_desc["inputs"], layer_desc["outputs"],
+                             BugNN.activation_from_name(layer_desc["activation"]),
+                             w, b)
+                       for layer_desc, w, b in zip(architecture, weights, biases)]
+
+    def __len__(self):
+        return self.layers[0].weights.shape[0]
+
+    def subset(self, rows):
+        """
+        :np.ndarray rows: Indices of brains to copy
+        :return: New BatchedBugNN containing copies of the given brains
+        """
+        return BatchedBugNN(self.architecture,
+                            [layer.weights[rows] for layer in self.layers],
+                            [layer.biases[rows] for layer in self.layers])
+
+    def forward(self, inputs, rows=None):
+        """
+        :np.ndarray inputs: (M, inputs) array, one row of inputs per evaluated brain
+        :np.ndarray rows: Indices of the M brains to evaluate, all brains if None
+        :return: (M, outputs) array of outputs
+        """
+        curr_matrix = inputs
+        for layer in self.layers:
+            w, b, activation = layer.weights, layer.biases, layer.activation
+            if rows is not None:
+                w, b = w[rows], b[rows]
+            curr_matrix = activation(np.matmul(w, curr_matrix[:, :, np.newaxis])[:, :, 0] + b)
+        return curr_matrix
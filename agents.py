@@ -1,9 +1,11 @@
 import pygame
 from sprites import BugSprite
 from NeuralNetwork import BugNN
+from genetic import BugGenome
 import numpy as np
 import random
 from utility import Vector, Point
+from population import PointView
 from utility import euclidean_distance as distance
 
 class Bug:
@@ -28,8 +30,10 @@ class Bug:
                  horn_colour, size, fov, eyesight, food_energy=None, movement_cost=None,
                  rotation_cost=None, wall_collide_cost=None,
                  bug_collide_cost=None, eat_cost=None, eaten_cost=None,
-                 eat_energy=None, brain=None, nn_seed=22, architecture=None):
+                 eat_energy=None, brain=None, nn_seed=22, architecture=None, genome=None, rng=None):
         # self.curr_angle = 0
+        # population and row this bug is a view onto, see bind
+        self.population, self.index = None, None
         self.max_speed = max_speed
         self.max_energy = max_energy
         self.max_rotate = max_rotate
@@ -51,26 +55,81 @@ class Bug:
         self.position = position
         self.sprite = BugSprite(position, angle=(nn_seed % 36), body_colour=self.body_colour, horn_colour=self.horn_colour,
                                 leg_colour=self.leg_colour)
-        self.brain = BugNN(seed=nn_seed, architecture=architecture) if brain is None else brain
+        # random brain drawn from the bug's own stream if given, otherwise seeded by nn_seed
+        self.brain = BugNN(seed=nn_seed, architecture=architecture, rng=rng) if brain is None else brain
+        # BugGenome this bug was created from, its colour and brain genes are shared with the bug
+        self.genome = genome
         self.fitness = 0
         self.is_dead = False
 
-    def update(self, state):
+    @property
+    def energy(self):
+        if self.population is None:
+            return self._energy
+        return float(self.population.energy[self.index])
+
+    @energy.setter
+    def energy(self, value):
+        if self.population is None:
+            self._energy = value
+        else:
+            self.population.energy[self.index] = value
+
+    @property
+    def fitness(self):
+        if self.population is None:
+            return self._fitness
+        return int(self.population.fitness[self.index])
+
+    @fitness.setter
+    def fitness(self, value):
+        if self.population is None:
+            self._fitness = value
+        else:
+            self.population.fitness[self.index] = value
+
+    @property
+    def is_dead(self):
+        if self.population is None:
+            return self._is_dead
+        return not self.population.alive[self.index]
+
+    @is_dead.setter
+    def is_dead(self, value):
+        if self.population is None:
+            self._is_dead = value
+        else:
+            self.population.alive[self.index] = not value
+
+    def bind(self, population, index):
+        """
+        Makes bug a view onto a row of population, state is read from and written to the population arrays
+        :Population population: Population holding the state of this bug
+        :int index: Row of population belonging to this bug
+        """
+        self.population, self.index = population, index
+        self.position = PointView(population.positions, index)
+        self.sprite.midpoint = self.position
+
+    def sync_sprite(self):
+        """Copies angle from population to sprite, population is the source of truth for bound bugs"""
+        if self.population is not None:
+            self.sprite.angle = float(self.population.angles[self.index])
+
+    def update(self, state, nn_output=None):
+        """
+        :state: Game state, unused for now
+        :np.ndarray nn_output: Precomputed output of brain (e.g. from BatchedBugNN), brain is run if None
+        """
+        self.sync_sprite()
         if self.energy <= 0:
             self.is_dead = True
             return
 
         self.fitness += 1
-        # generate fake random input
-        nn_input = 0 * np.random.random(6)
-        # set energy input
-        nn_input[0] = self.energy / self.max_energy
-        # set obstacle input
-        distance_to_bounds = self._get_closest_bound()
-        nn_input[4] = max(0, 1 - distance_to_bounds / self.eyesight)
-
-        # get output of neural network
-        nn_output = self.brain.forward(nn_input)
+        if nn_output is None:
+            # get output of neural network
+            nn_output = self.brain.forward(self.get_nn_input())
 
         # choose action
         self._get_action(nn_output)
@@ -87,9 +146,19 @@ class Bug:
         # # updates attributes
         # self.update_self(action, energy_change)
 
+    def get_nn_input(self):
+        nn_input = np.zeros(6)
+        # set energy input
+        nn_input[0] = self.energy / self.max_energy
+        # set obstacle input
+        distance_to_bounds = self._get_closest_bound()
+        nn_input[4] = max(0, 1 - distance_to_bounds / self.eyesight)
+        return nn_input
+
     def get_genome(self):
-        """Get genome of bug, [colour genes], [weight genes], [bias genes]"""
-        """MAKE THIS CONSISTENT WITH BUGGENOME OBJECT"""
+        """Get genome of bug as a BugGenome of [colour genes], [weight genes], [bias genes]"""
+        if self.genome is not None:
+            return self.genome
         # Colour genes: Body, legs, horns
         colour_genes = []
         body_colours = [colour/255.0 for colour in self.body_colour]
@@ -100,10 +169,7 @@ class Bug:
         colour_genes.extend(horn_colours)
         # Neural network genes: weights, biases
         brain_genes = self.brain.get_brain_genome()
-        genome = colour_genes
-        genome.extend(brain_genes[0])
-        genome.extend(brain_genes[1])
-        return genome
+        return BugGenome(colour_genes, brain_genes[0], brain_genes[1])
 
     def get_input(self, state):
         energy = self.energy
@@ -120,22 +186,25 @@ class Bug:
             self.energy -= Bug.rotation_cost
 
         # move in straight line
-        direction = self.sprite.pointing_vector()
+        direction_x, direction_y = self.sprite.pointing_components()
         speed = self.max_speed * nn_output[3]
-        move_vector = direction * speed
-        destination = self.sprite.translate_by(move_vector)
-        if (self.x_bound_low < destination.x < self.x_bound_high) \
-                and (self.y_bound_low < destination.y < self.y_bound_high):
-            self.sprite.translate_by_ip(direction * (self.max_speed * nn_output[3]))
+        midpoint = self.sprite.midpoint
+        if (self.x_bound_low < midpoint.x + direction_x * speed < self.x_bound_high) \
+                and (self.y_bound_low < midpoint.y + direction_y * speed < self.y_bound_high):
+            midpoint.translate_along_ip(direction_x, direction_y, speed)
             self.energy -= (Bug.movement_cost / (nn_output[3] ** 2))
         else:
             self.energy -= Bug.wall_collide_cost
 
         if self.energy <= 0:
-            self.is_dead = True
-            self.sprite.new_colour(body_colour=(80, 80, 80, 150),
-                                   leg_colour=(80, 80, 80, 150),
-                                   horn_colour=(80, 80, 80, 150))
+            self.die()
+
+    def die(self):
+        """Marks bug as dead and greys out its sprite"""
+        self.is_dead = True
+        self.sprite.new_colour(body_colour=(80, 80, 80, 150),
+                               leg_colour=(80, 80, 80, 150),
+                               horn_colour=(80, 80, 80, 150))
 
     def get_action(self, nn_output, state):
         pass
@@ -147,6 +216,7 @@ class Bug:
         pass
 
     def draw(self):
+        self.sync_sprite()
         return self.sprite.draw()
 
     def get_coords(self):
@@ -154,6 +224,8 @@ class Bug:
 
     def rotate(self, angle):
         self.sprite.rotate_about_midpoint_ip(angle)
+        if self.population is not None:
+            self.population.angles[self.index] = self.sprite.angle
 
     def _get_closest_bound(self):
         curr_location_x, curr_location_y = self.sprite.get_coords()
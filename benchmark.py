@@ -0,0 +1,222 @@
+"""
+Benchmarks of the simulation, drawing, UI and genetic algorithm hot paths at several population sizes.
+Runs headless with the dummy SDL drivers, results are printed and written as JSON to diff between versions.
+
+    python benchmark.py [--sizes 400,4000] [--ticks 10] [--repeat 3] [--output benchmark.json]
+"""
+import os
+# must be set before pygame initialises its display
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import sys
+import json
+import time
+import platform
+import tracemalloc
+import numpy as np
+import pygame
+import agents
+import genetic
+import ui_module
+import NeuralNetwork
+from config import ExperimentConfig
+from population import Population
+from streams import RandomStreams
+from utility import Point
+
+config = ExperimentConfig()
+architecture, bounds, eyesight = config.architecture, config.bounds, config.eyesight
+max_speed, max_energy, max_rotate = config.max_speed, config.max_energy, config.max_rotate
+
+
+def measure(name, size, function, work, unit, repeat):
+    """
+    Times function and measures its peak memory
+    :str name: Name of benchmark
+    :int size: Population size, None if the benchmark does not depend on it
+    :Callable function: Runs the benchmark once, must be safe to call repeatedly
+    :int work: Number of units of work done by one call, e.g. bug-ticks
+    :str unit: Name of one unit of work
+    :int repeat: Number of timed calls, the fastest is reported
+    :return: dict of results
+    """
+    function()  # warm up caches
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    # separate call, tracing allocations slows the call down
+    tracemalloc.start()
+    function()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    seconds = min(times)
+    result = {"name": name, "size": size, "seconds": seconds, "mean_seconds": sum(times) / len(times),
+              "throughput": work / seconds, "unit": f"{unit}/s", "peak_memory_bytes": peak_memory}
+    print(f"{name:<24} {'' if size is None else size:>6} {seconds * 1000:>10.2f} ms "
+          f"{work / seconds:>14.0f} {unit}/s {peak_memory / 2 ** 20:>9.2f} MiB")
+    return result
+
+
+def make_bugs(num_bugs, streams):
+    """
+    :int num_bugs: Number of bugs
+    :RandomStreams streams: Streams of bugs and positions
+    :return: List of unbound Bug with random positions, colours and brains
+    """
+    rng = streams.positions(0)
+    (x_low, x_high), (y_low, y_high) = bounds
+    coords = np.column_stack((rng.uniform(x_low + 70, x_high - 70, num_bugs),
+                              rng.uniform(y_low + 70, y_high - 70, num_bugs))).tolist()
+    bugs = []
+    for (x, y), bug_stream in zip(coords, streams.bugs(0, num_bugs)):
+        body_colour, leg_colour, horn_colour = bug_stream.integers(80, 210, (3, 3), endpoint=True).tolist()
+        bugs.append(agents.Bug(Point(x, y), max_speed=max_speed, max_energy=max_energy, max_rotate=max_rotate,
+                               bounds=bounds, body_colour=tuple(body_colour), leg_colour=tuple(leg_colour),
+                               horn_colour=tuple(horn_colour), size=1, fov=1, eyesight=eyesight,
+                               nn_seed=int(bug_stream.integers(0, 1000000)), architecture=architecture,
+                               rng=bug_stream))
+    return bugs
+
+
+def refill(bugs):
+    """Brings bugs back to life with full energy, call before every tick so every bug does a tick of work"""
+    for bug in bugs:
+        bug.energy = bug.max_energy
+        bug.is_dead = False
+
+
+def simulation_benchmarks(size, ticks, repeat, streams):
+    bugs = make_bugs(size, streams)
+    results = []
+
+    def bug_update():
+        for _ in range(ticks):
+            # bugs that died would skip update
+            refill(bugs)
+            for bug in bugs:
+                bug.update(None)
+    results.append(measure("Bug.update", size, bug_update, size * ticks, "bug-ticks", repeat))
+
+    # inputs of dead bugs are not finite
+    refill(bugs)
+    nn_inputs = [bug.get_nn_input() for bug in bugs]
+
+    def bugnn_forward():
+        for _ in range(ticks):
+            for bug, nn_input in zip(bugs, nn_inputs):
+                bug.brain.forward(nn_input)
+    results.append(measure("BugNN.forward", size, bugnn_forward, size * ticks, "forwards", repeat))
+
+    def sprite_draw():
+        for bug in bugs:
+            bug.sprite.draw()
+    results.append(measure("BugSprite.draw", size, sprite_draw, size, "draws", repeat))
+
+    # batched path used by Engine.game_step
+    refill(bugs)
+    population = Population.from_bugs(bugs)
+    brains = NeuralNetwork.BatchedBugNN.from_brains([bug.brain for bug in bugs])
+    all_rows = np.arange(size)
+    batch_inputs = population.get_nn_inputs(all_rows)
+    results.append(measure("BatchedBugNN.forward", size, lambda: [brains.forward(batch_inputs, all_rows)
+                                                                  for _ in range(ticks)],
+                           size * ticks, "forwards", repeat))
+
+    def population_step():
+        for _ in range(ticks):
+            # bugs that died would drop out of apply_actions
+            population.energy[:] = population.max_energy
+            population.alive[:] = True
+            rows = population.alive_indices()
+            population.apply_actions(brains.forward(population.get_nn_inputs(rows), rows), rows)
+    results.append(measure("Population step", size, population_step, size * ticks, "bug-ticks", repeat))
+    return results
+
+
+def genetic_benchmarks(size, repeat, streams):
+    genome_rng = streams.ga(0)
+    num_genes = sum(genetic.BugGenome.segment_lengths(architecture))
+    genome_matrix = genome_rng.uniform(-1, 1, (size, num_genes)).astype(np.float32)
+    fitness = genome_rng.integers(100, 2000, size)
+    rates = config.genetic_settings()
+    results = []
+
+    genomes = [genetic.BugGenome.from_buffer(row, architecture) for row in genome_matrix.copy()]
+    controller = genetic.GeneticController(list(zip(genomes, fitness.tolist())), **rates, rng=streams.ga(1))
+    pairs = controller.sus_selection()
+    children = [controller.crossover(*pair) for pair in pairs]
+    results.append(measure("GA sus_selection", size, controller.sus_selection, size, "genomes", repeat))
+    results.append(measure("GA crossover", size, lambda: [controller.crossover(*pair) for pair in pairs],
+                           size, "genomes", repeat))
+    results.append(measure("GA mutate", size, lambda: [controller.mutate(child) for child in children],
+                           size, "genomes", repeat))
+
+    batch_controller = genetic.BatchGeneticController(genome_matrix, fitness, **rates, rng=streams.ga(2))
+    mates_a, mates_b = genetic.GeneticController.sus_indices(batch_controller.fitness, batch_controller.rng)
+    parents_a, parents_b = batch_controller.genomes[mates_a], batch_controller.genomes[mates_b]
+    results.append(measure("Batch GA sus_selection", size,
+                           lambda: genetic.GeneticController.sus_indices(batch_controller.fitness,
+                                                                         batch_controller.rng),
+                           size, "genomes", repeat))
+    results.append(measure("Batch GA crossover", size,
+                           lambda: genetic.BatchGeneticController.crossover(parents_a, parents_b,
+                                                                            batch_controller.rng),
+                           size, "genomes", repeat))
+    batch_children = genetic.BatchGeneticController.crossover(parents_a, parents_b, batch_controller.rng)
+    results.append(measure("Batch GA mutate", size, lambda: batch_controller.mutate(batch_children.copy()),
+                           size, "genomes", repeat))
+    return results
+
+
+def ui_benchmark(num_updates, repeat):
+    pygame.font.init()
+    font = pygame.font.Font(None, 18)
+    clock = pygame.time.Clock()
+    ui = ui_module.UI(1000, 0, 310, 100, border_colour=(0, 120, 0))
+    ui.add_elements(["game"], [ui_module.UI_fps(10, 10, 300, 20, (0, 255, 0), font, clock),
+                               ui_module.UI_status(10, 30, 300, 20, (0, 255, 0), font),
+                               ui_module.UI_alive(10, 50, 300, 20, (0, 255, 0), font, 400),
+                               ui_module.UI_fitness(10, 70, 300, 20, (0, 255, 0), font)])
+
+    def ui_update():
+        # fitness changes every update, number alive every few, status and generation never
+        for tick in range(num_updates):
+            ui.update(["game"], {"status": False, "num_dead": tick // 8, "fitness": tick, "generation": 1})
+    return [measure("UI.update", None, ui_update, num_updates, "updates", repeat)]
+
+
+def run(sizes, ticks, repeat, seed=0):
+    """
+    :[int] sizes: Population sizes to benchmark
+    :int ticks: Simulation ticks per timed call of the simulation benchmarks
+    :int repeat: Number of timed calls of each benchmark
+    :int seed: Master seed of the benchmark populations
+    :return: dict of environment and list of results
+    """
+    print(f"{'benchmark':<24} {'size':>6} {'time':>13} {'throughput':>14}")
+    results = ui_benchmark(1000, repeat)
+    for size in sizes:
+        streams = RandomStreams(seed)
+        results.extend(simulation_benchmarks(size, ticks, repeat, streams))
+        results.extend(genetic_benchmarks(size, repeat, streams))
+    return {"python": platform.python_version(),
+            "numpy": np.__version__,
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "sizes": sizes, "ticks": ticks, "repeat": repeat, "seed": seed,
+            "results": results}
+
+
+if __name__ == "__main__":
+    sizes = [int(size) for size in sys.argv[sys.argv.index("--sizes") + 1].split(",")] \
+        if "--sizes" in sys.argv else [400, 4000]
+    ticks = int(sys.argv[sys.argv.index("--ticks") + 1]) if "--ticks" in sys.argv else 10
+    repeat = int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv else 3
+    output = sys.argv[sys.argv.index("--output") + 1] if "--output" in sys.argv else "benchmark.json"
+    report = run(sizes, ticks, repeat)
+    with open(output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {output}.")
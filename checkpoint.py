@@ -0,0 +1,127 @@
+"""
+Population checkpoint file layout (all integers little endian):
+    8 bytes   magic, b"BUGPOP\0\0"
+    uint32    format version
+    uint32    length of header in bytes
+    header    utf-8 JSON: architecture, generation, num_genomes, genome_length, dtype,
+              data_offset, fitness (optional), seed (optional)
+    padding   zeros up to data_offset, a multiple of 64
+    genomes   (num_genomes, genome_length) float32 matrix in C order
+"""
+
+import os
+import json
+import struct
+import pickle
+import numpy as np
+from dataclasses import dataclass
+
+
+MAGIC = b"BUGPOP\x00\x00"
+VERSION = 1
+EXTENSION = "bugpop"
+ALIGNMENT = 64
+PREAMBLE = struct.Struct("<8sII")
+
+
+@dataclass
+class Checkpoint:
+    """Contents of a population checkpoint"""
+    architecture: list
+    generation: int
+    genomes: np.ndarray
+    fitness: list = None
+    # master seed of streams.RandomStreams
+    seed: int = None
+
+    def __len__(self):
+        return self.genomes.shape[0]
+
+
+def is_checkpoint(filepath):
+    with open(filepath, 'rb') as file:
+        return file.read(len(MAGIC)) == MAGIC
+
+
+def save(filepath, genomes, architecture, generation, fitness=None, seed=None):
+    """
+    Writes a population checkpoint, the file is replaced atomically
+    :str filepath: Path of checkpoint file
+    :np.ndarray genomes: (N, genome_len) matrix of genomes
+    :[dict] architecture: Architecture of BugNN shared by all genomes
+    :int generation: Generation number
+    :[int] fitness: Fitness of each genome
+    :int seed: Master seed of the run's random streams
+    """
+    genomes = np.ascontiguousarray(genomes, dtype='<f4')
+    header = {"architecture": architecture,
+              "generation": generation,
+              "num_genomes": genomes.shape[0],
+              "genome_length": genomes.shape[1],
+              "dtype": "<f4",
+              "fitness": None if fitness is None else [int(f) for f in fitness],
+              "seed": seed}
+    # data offset depends on header length, which depends on data offset
+    header["data_offset"] = 0
+    while True:
+        header_bytes = json.dumps(header).encode("utf-8")
+        data_offset = -(-(PREAMBLE.size + len(header_bytes)) // ALIGNMENT) * ALIGNMENT
+        if data_offset == header["data_offset"]:
+            break
+        header["data_offset"] = data_offset
+
+    temp_filepath = f"{filepath}.tmp"
+    with open(temp_filepath, 'wb') as file:
+        file.write(PREAMBLE.pack(MAGIC, VERSION, len(header_bytes)))
+        file.write(header_bytes)
+        file.write(b"\x00" * (data_offset - PREAMBLE.size - len(header_bytes)))
+        genomes.tofile(file)
+    os.replace(temp_filepath, filepath)
+
+
+def load(filepath, mmap=True):
+    """
+    Reads a population checkpoint
+    :str filepath: Path of checkpoint file
+    :bool mmap: Map genomes from the file lazily instead of reading them into memory
+    :return: Checkpoint
+    """
+    with open(filepath, 'rb') as file:
+        magic, version, header_length = PREAMBLE.unpack(file.read(PREAMBLE.size))
+        if magic != MAGIC:
+            raise Exception(f"{filepath} is not a population checkpoint.")
+        if version > VERSION:
+            raise Exception(f"Checkpoint version {version} of {filepath} is newer than supported version {VERSION}.")
+        header = json.loads(file.read(header_length).decode("utf-8"))
+    shape = (header["num_genomes"], header["genome_length"])
+    if mmap:
+        genomes = np.memmap(filepath, dtype=header["dtype"], mode='r', offset=header["data_offset"], shape=shape)
+    else:
+        genomes = np.fromfile(filepath, dtype=header["dtype"], count=shape[0] * shape[1],
+                              offset=header["data_offset"]).reshape(shape)
+    return Checkpoint(header["architecture"], header["generation"], genomes,
+                      header.get("fitness"), header.get("seed"))
+
+
+def load_legacy(filepath):
+    """
+    Reads a pickled .agents file saved by older versions of Engine.save
+    :str filepath: Path of .agents file
+    :return: Checkpoint
+    """
+    with open(filepath, 'rb') as file:
+        loaded_agents, generation = pickle.load(file)
+    genomes = np.array([genome for genome, _ in loaded_agents], dtype=np.float32)
+    return Checkpoint(loaded_agents[0][1], generation, genomes)
+
+
+def load_any(filepath, mmap=True):
+    """
+    Reads either a population checkpoint or a legacy pickled .agents file
+    :str filepath: Path of file
+    :bool mmap: Map genomes of population checkpoints lazily
+    :return: Checkpoint
+    """
+    if is_checkpoint(filepath):
+        return load(filepath, mmap=mmap)
+    return load_legacy(filepath)
@@ -0,0 +1,71 @@
+import math
+from dataclasses import dataclass, field
+
+
+def default_architecture():
+    return [
+        {"inputs": 6, "outputs": 5, "activation": "relu"},
+        {"inputs": 5, "outputs": 4, "activation": "relu"},
+        {"inputs": 4, "outputs": 5, "activation": "relu"}
+    ]
+
+
+@dataclass
+class ExperimentConfig:
+    """Settings of one evolution run, read by Engine instead of module globals"""
+    # mutation rates of the genetic algorithm
+    flip_rate: float = 0.0005
+    swap_rate: float = 0.0008
+    shuffle_rate: float = 0.001
+    reverse_rate: float = 0.001
+    noise_rate: float = 0.009
+    noise_sd: float = 0.1
+
+    # bugs
+    num_bugs: int = 400
+    max_speed: float = 2
+    max_energy: float = 400
+    max_rotate: float = math.pi / 100
+    bounds: tuple = ((10, 990), (10, 990))
+    eyesight: float = 35
+    architecture: list = field(default_factory=default_architecture)
+
+    # environment
+    vision: bool = False
+    num_food: int = 0
+    # food items regrown per tick, with regrowth some bugs can live forever so set max_ticks as well
+    food_regrowth_rate: float = 0
+    # where food spawns, see FoodField.policies
+    food_policy: str = "uniform"
+    # master seed of every random stream of the run, fresh entropy if None
+    seed: int = None
+
+    # termination, a generation ends early after max_ticks ticks, or once fewer than min_alive_fraction of bugs
+    # are alive, no limit if None. Survivors all tie for the best fitness at the cutoff
+    max_ticks: int = None
+    min_alive_fraction: float = None
+    # the run stops once best fitness has not improved by more than plateau_min_delta in plateau_patience
+    # generations, never stops if None
+    plateau_patience: int = None
+    plateau_min_delta: float = 0
+
+    # output
+    save_name: str = "agents"
+    # csv file max, mean and median fitness of every generation are appended to, not written if None
+    stats_path: str = "bug_stats.csv"
+    # print stats of every generation
+    verbose: bool = True
+
+    def genetic_settings(self):
+        """
+        :return: dict of GeneticController mutation rate keyword arguments
+        """
+        return {"flip_rate": self.flip_rate, "swap_rate": self.swap_rate, "shuffle_rate": self.shuffle_rate,
+                "reverse_rate": self.reverse_rate, "noise_rate": self.noise_rate, "noise_sd": self.noise_sd}
+
+    def bug_settings(self):
+        """
+        :return: dict of bug settings (architecture, max_speed, max_energy, max_rotate, bounds, eyesight)
+        """
+        return {"architecture": self.architecture, "max_speed": self.max_speed, "max_energy": self.max_energy,
+                "max_rotate": self.max_rotate, "bounds": self.bounds, "eyesight": self.eyesight}
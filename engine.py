@@ -1,20 +1,30 @@
 import csv
 import sys
 import math
+import time
+import threading
 import pygame
 import agents
 import utility
 import sprites
-import random
 import ui_module
 import genetic
 import NeuralNetwork
-import pickle
+import checkpoint
+import numpy as np
+from population import Population
+from parallel import ParallelEvaluator
+from renderer import Renderer, SnapshotBuffer
+from sensors import Vision
+from food import FoodField
+from streams import RandomStreams
+from profiler import Profiler
+from config import ExperimentConfig
 from statistics import mean, median
 
 class Engine:
     @staticmethod
-    def initialise_positions(num_pos, x_low, x_high, y_low, y_high):
+    def initialise_positions(num_pos, x_low, x_high, y_low, y_high, rng):
         """
         Initialise random positions
         :int num_pos: Number of random positions to initialise
@@ -22,15 +32,61 @@ class Engine:
         :int x_high: Upper bound of x positions
         :int y_low: Lower bound of y positions
         :int y_high: Upper bound of y positions
+        :np.random.Generator rng: Stream to draw positions from
         :return: List of Point objects at random locations
         """
-        positions = []
-        for _ in range(num_pos):
-            positions.append(utility.Point(random.randint(x_low, x_high),
-                                           random.randint(y_low, y_high)))
-        return positions
+        coords = np.column_stack((rng.integers(x_low, x_high, num_pos, endpoint=True),
+                                  rng.integers(y_low, y_high, num_pos, endpoint=True)))
+        return [utility.Point(x, y) for x, y in coords.tolist()]
 
-    def __init__(self, size, background_colour, fps, ui, ui_fps, save_name="agents"):
+    @staticmethod
+    def write_stats(filepath, generation, fitness_list):
+        """
+        Appends max, mean and median fitness of a generation to a csv file
+        :str filepath: Path of csv file
+        :int generation: Generation number
+        :[int] fitness_list: Fitness of every bug in the generation
+        """
+        with open(filepath, 'a') as file:
+            csv_writer = csv.writer(file, delimiter=',', lineterminator='\n')
+            csv_writer.writerow([generation,
+                                 max(fitness_list),
+                                 round(mean(fitness_list), 2),
+                                 median(fitness_list)])
+
+    @staticmethod
+    def clip_colours(genome_matrix):
+        """
+        Clips colour genes to RGB values between 0 to 255, colour genes are overwritten with the clipped colours
+        :np.ndarray genome_matrix: (N, genome_len) matrix of genomes
+        :return: List of (body colour, leg colour, horn colour) of each genome
+        """
+        num_colour_genes = genetic.BugGenome.num_colour_genes
+        colour_values = np.clip(np.trunc(genome_matrix[:, :num_colour_genes] * 255), 0, 255)
+        genome_matrix[:, :num_colour_genes] = colour_values / 255.0
+        return [(tuple(colours[0:3]), tuple(colours[3:6]), tuple(colours[6:9]))
+                for colours in colour_values.astype(int).tolist()]
+
+    def __init__(self, size, background_colour, fps, ui, ui_fps, config=None, headless=False,
+                 workers=0, steps_per_frame=1, render_thread=False, food_field=None, profiler=None):
+        """
+        :(int, int) size: Size of window (x, y)
+        :(int, int, int) background_colour: Colour of canvas background
+        :int fps: Frame rate cap of visual mode
+        :UI ui: UI object drawn on the canvas, unused if headless
+        :int ui_fps: Rate at which UI is refreshed
+        :ExperimentConfig config: Genetic algorithm, bug, environment and output settings, defaults if None
+        :bool headless: Run simulation without display, mixer, fonts or frame rate cap
+        :int workers: Number of worker processes each generation is split across, 0 to run in this process
+        :int steps_per_frame: Simulation steps per drawn frame, None to step as fast as possible and draw at fps
+        :bool render_thread: Step simulation on a background thread, drawing the latest snapshot at fps
+        :FoodField food_field: Food bugs eat to gain energy, reset every generation, made from config if None
+        :Profiler profiler: Records time spent in each phase of the game loop, disabled if None
+        """
+        if workers and not headless:
+            raise Exception("Parallel evaluation is only available in headless mode.")
+        if render_thread and headless:
+            raise Exception("Render thread is not available in headless mode.")
         self.size = size
         self.width, self.height = size
         self.background_colour = background_colour
@@ -38,8 +94,47 @@ class Engine:
         self.ui_ratio = fps // ui_fps
         self.frame_time = 1000 // fps
         self.ui = ui
-        self.save_name = save_name
+        self.config = config if config is not None else ExperimentConfig()
+        self.save_name = self.config.save_name
         self.agents = []
+        self.population = None
+        self.brains = None
+        # genomes of current agents, one row per agent
+        self.genome_matrix = None
+        # generation to start counting from, set when loading a checkpoint
+        self.start_generation = 0
+        self.headless = headless
+        self.workers = workers
+        self.steps_per_frame = steps_per_frame
+        self.render_thread = render_thread
+        self.vision = self.config.vision
+        if food_field is None and self.config.num_food:
+            food_field = FoodField(self.config.bounds, self.config.num_food,
+                                   regrowth_rate=self.config.food_regrowth_rate, policy=self.config.food_policy)
+        if workers and (self.vision or food_field is not None):
+            # shards are simulated apart, so bugs could neither see each other nor share the food
+            raise Exception("Parallel evaluation is not available with vision or food.")
+        if workers and self.config.min_alive_fraction is not None:
+            # each shard would apply the cutoff to its own alive count, ending at other ticks than a serial run
+            raise Exception("Parallel evaluation is not available with min_alive_fraction.")
+        self.food_field = food_field
+        self.streams = RandomStreams(self.config.seed)
+        # max, mean and median fitness of every finished generation
+        self.history = []
+        # set once a termination policy stops the run
+        self.stopped = False
+        self.profiler = profiler if profiler is not None else Profiler(enabled=False)
+        # whether game_step draws frames itself, the render thread draws them otherwise
+        self.render_in_step = not headless and not render_thread
+        self.frames = 0
+        self.last_frame_time = 0
+        self.snapshots = None
+        # agents and alive flags of the last snapshot drawn by the render thread
+        self.snapshot_agents, self.snapshot_alive = None, None
+        self.evaluator = None
+        self.canvas, self.clock, self.font, self.renderer = None, None, None, None
+        if headless:
+            return
         pygame.display.init()
         pygame.mixer.pre_init(frequency=44100, size=-16, channels=2,
                               buffer=512, allowedchanges=pygame.AUDIO_ALLOW_ANY_CHANGE)
@@ -48,8 +143,27 @@ class Engine:
         self.font = pygame.font.SysFont("calibri", 14)
 
     def start(self):
+        if self.workers:
+            self.evaluator = ParallelEvaluator(self.workers, max_ticks=self.config.max_ticks)
+        if self.headless:
+            return
         self.canvas = pygame.display.set_mode(self.size)
         self.clock = pygame.time.Clock()
+        self.renderer = Renderer(self.canvas, self.background_colour)
+
+    def spawn_agents(self):
+        """Adds config.num_bugs bugs of the first generation with random colours and brains, at the field's centre"""
+        config = self.config
+        (x_low, x_high), (y_low, y_high) = config.bounds
+        for bug_stream in self.streams.bugs(0, config.num_bugs):
+            body_colour, leg_colour, horn_colour = bug_stream.integers(80, 210, (3, 3), endpoint=True).tolist()
+            self.add_agent(agents.Bug(utility.Point((x_low + x_high) / 2, (y_low + y_high) / 2),
+                                      max_speed=config.max_speed, max_energy=config.max_energy,
+                                      max_rotate=config.max_rotate, bounds=config.bounds,
+                                      body_colour=tuple(body_colour), leg_colour=tuple(leg_colour),
+                                      horn_colour=tuple(horn_colour), size=1, fov=1, eyesight=config.eyesight,
+                                      nn_seed=int(bug_stream.integers(0, 1000000)),
+                                      architecture=config.architecture, rng=bug_stream))
 
     def add_agent(self, agent):
         self.agents.append(agent)
@@ -58,143 +172,314 @@ class Engine:
         for agent in agents:
             self.add_agent(agent)
 
-    def load(self, loaded_agents):
-        """Hacky way of doing it, change later!!!"""
-        # assumes loaded_agents has same number of agents as self.agents, fix later
-        for i, agent in enumerate(loaded_agents[0]):
-            genome = agent[0]
+    def load(self, filepath):
+        """
+        Loads genomes of a population checkpoint (or a legacy pickled .agents file) into the current agents.
+        If the checkpoint holds more genomes than there are agents the fittest are used,
+        if it holds fewer they are repeated.
+        :str filepath: Path of checkpoint
+        """
+        loaded = checkpoint.load_any(filepath)
+        if loaded.architecture != self.config.architecture:
+            # children are bred with config.architecture, so their brains would not match the genomes
+            raise Exception(f"Checkpoint architecture {loaded.architecture} of {filepath} differs from "
+                            f"configured architecture {self.config.architecture}.")
+        order = np.arange(len(loaded))
+        if loaded.fitness is not None:
+            order = np.argsort(-np.asarray(loaded.fitness), kind='stable')
+        rows = order[np.arange(len(self.agents)) % len(loaded)]
+        # copies the selected rows out of the memory map
+        self.genome_matrix = np.array(loaded.genomes[rows], dtype=np.float32)
+        self.start_generation = loaded.generation
+        if loaded.seed is not None:
+            # resumed run continues the same streams
+            self.streams = RandomStreams(loaded.seed)
+
+        colours = Engine.clip_colours(self.genome_matrix)
+        angles = self.streams.positions(self.start_generation).random(len(self.agents)) * math.pi * 2
+        for i, agent in enumerate(self.agents):
+            genome = genetic.BugGenome.from_buffer(self.genome_matrix[i], loaded.architecture)
             # colour
-            self.agents[i].body_colour = tuple(min(255, max(0, int(c * 255))) for c in genome[0:3])
-            self.agents[i].leg_colour = tuple(min(255, max(0, int(c * 255))) for c in genome[3:6])
-            self.agents[i].horn_colour = tuple(min(255, max(0, int(c * 255))) for c in genome[6:9])
-            self.agents[i].sprite = sprites.BugSprite(self.agents[i].position, angle=random.random() * math.pi * 2,
-                                                      body_colour=self.agents[i].body_colour,
-                                                      horn_colour=self.agents[i].horn_colour,
-                                                      leg_colour=self.agents[i].leg_colour)
+            agent.body_colour, agent.leg_colour, agent.horn_colour = colours[i]
+            agent.sprite = sprites.BugSprite(agent.position, angle=angles[i],
+                                             body_colour=agent.body_colour,
+                                             horn_colour=agent.horn_colour,
+                                             leg_colour=agent.leg_colour)
             # brain
-            brain = genome[9:]
-            architecture = agent[1]
-            self.agents[i].brain = NeuralNetwork.BugNN(architecture=architecture)
-            self.agents[i].brain.set_brain_connections(brain)
+            agent.brain = NeuralNetwork.BugNN(architecture=loaded.architecture, brain_genome=genome.get_brain_genes())
+            agent.genome = genome
+        print(f"Generation {loaded.generation} loaded from {filepath}.")
 
     def save(self, generation):
-        agent_genomes = [agent.get_genome() for agent in self.agents]
-        agent_architecture = [agent.brain.architecture for agent in self.agents]
-        with open(f"{self.save_name}_{generation}.agents", 'wb') as file:
-            pickle.dump([list(zip(agent_genomes, agent_architecture)), generation], file)
+        timer = self.profiler.start()
+        genome_matrix = self.genome_matrix if self.genome_matrix is not None \
+            else np.stack([agent.get_genome().genome for agent in self.agents])
+        checkpoint.save(f"{self.save_name}_{generation}.{checkpoint.EXTENSION}", genome_matrix,
+                        self.agents[0].brain.architecture, generation,
+                        fitness=[agent.fitness for agent in self.agents],
+                        seed=self.streams.seed)
         print(f"Generation {generation} saved.")
+        self.profiler.stop("save", timer)
 
-    def game_loop(self):
-        ui_dict = {'status': False, 'num_dead': 0, 'fitness': 0, 'generation': 0}
-
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+    def build_population(self, generation=None):
+        """
+        Stores state of current agents in a Population and their genomes in one genome matrix,
+        the brains used for batched forward passes are views onto the genome matrix
+        :int generation: Generation of current agents, start_generation if None
+        """
+        generation = self.start_generation if generation is None else generation
+        self.population = Population.from_bugs(self.agents)
+        if self.genome_matrix is None:
+            self.genome_matrix = np.stack([agent.get_genome().genome for agent in self.agents])
+        self.brains = NeuralNetwork.BatchedBugNN.from_brain_genomes(
+            self.genome_matrix[:, genetic.BugGenome.num_colour_genes:], self.agents[0].brain.architecture)
+        if self.vision:
+            self.population.vision = Vision(self.agents[0].fov, self.agents[0].eyesight)
+        if self.food_field is not None:
+            self.food_field.reset(self.streams.food(generation))
+            self.population.food = self.food_field
+
+    def handle_events(self, ui_dict):
+        timer = self.profiler.start()
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.save(ui_dict['generation'])
+                sys.exit()
+            if event.type == pygame.KEYUP:
+                if event.key == pygame.K_s:
                     self.save(ui_dict['generation'])
-                    sys.exit()
-                if event.type == pygame.KEYUP:
-                    if event.key == pygame.K_s:
-                        self.save(ui_dict['generation'])
-
-            # refresh canvas
-            self.canvas.fill(self.background_colour)
-            if ui_dict['num_dead'] == len(self.agents):
-                # update status to show we are running genetic algo
-                ui_dict['status'] = True
+        self.profiler.stop("events", timer)
+
+    def begin(self):
+        """
+        Builds the population of the starting generation
+        :return: ui_dict the game loop steps with
+        """
+        self.build_population(self.start_generation)
+        return {'status': False, 'num_dead': 0, 'fitness': 0, 'generation': self.start_generation}
+
+    def game_loop(self):
+        ui_dict = self.begin()
+
+        try:
+            while not self.stopped:
+                if self.evaluator is not None:
+                    self.parallel_step(ui_dict)
+                elif self.render_thread:
+                    self.threaded_loop(ui_dict)
+                else:
+                    self.game_step(ui_dict)
+        except KeyboardInterrupt:
+            # headless runs have no window to close, ctrl-c saves and exits instead
+            if self.evaluator is not None:
+                self.evaluator.close()
+            self.save(ui_dict['generation'])
+            sys.exit()
+        # stopped by a termination policy
+        if self.evaluator is not None:
+            self.evaluator.close()
+        self.save(ui_dict['generation'])
+
+    def parallel_step(self, ui_dict):
+        """Runs a whole generation on the worker pool, then the genetic algorithm"""
+        timer = self.profiler.start()
+        self.evaluator.evaluate(self.population, self.brains)
+        self.profiler.stop("evaluate", timer)
+        ui_dict['num_dead'] = len(self.agents)
+        ui_dict['fitness'] = int(self.population.fitness.max())
+        ui_dict['status'] = True
+        self.next_generation(ui_dict)
+
+    def game_step(self, ui_dict):
+        if self.population.generation_over(ui_dict['fitness'], self.config.max_ticks, self.config.min_alive_fraction):
+            # update status to show we are running genetic algo
+            ui_dict['status'] = True
+            if self.render_in_step:
                 # force screen to update
                 self.update_screen(ui_dict)
-                # run genetic algorithm
-                # fix hardcoding at some point
-                population = []
-                for agent in self.agents:
-                    gene_list = agent.get_genome()
-                    # FIX THIS HARDCODING
-                    genome = genetic.BugGenome(gene_list[:9], gene_list[9:75], gene_list[75:])
-                    fitness = agent.fitness
-                    population.append((genome, fitness))
-
-                genetic_controller = genetic.GeneticController(population,
-                                                               flip_rate=flip_rate,
-                                                               swap_rate=swap_rate,
-                                                               shuffle_rate=shuffle_rate,
-                                                               reverse_rate=reverse_rate,
-                                                               noise_rate=noise_rate,
-                                                               noise_sd=noise_sd)
-                new_agent_genomes = genetic_controller.generate_children()
-                new_agents = []
-                if len(new_agent_genomes) > len(self.agents):
-                    new_agent_genomes = new_agent_genomes[:len(self.agents)]
-
-                positions = Engine.initialise_positions(len(self.agents), 80, 920, 80, 920)
-
-                for idx, genome in enumerate(new_agent_genomes):
-                    # clip RGB values of colours between 0 to 255
-                    body_colour = tuple(min(255, max(0, int(c*255))) for c in genome[0].get_gene_segment(0, 3))
-                    leg_colour = tuple(min(255, max(0, int(c*255))) for c in genome[0].get_gene_segment(3, 6))
-                    horn_colour = tuple(min(255, max(0, int(c*255))) for c in genome[0].get_gene_segment(6, 9))
-                    # crete new brain for child
-                    brain_genes = genome[0].get_gene_segment(9, len(genome[0]))
-                    new_brain = NeuralNetwork.BugNN(architecture=architecture)
-                    new_brain.set_brain_connections(brain_genes)
-                    new_agents.append(agents.Bug(positions[idx], max_speed=max_speed,
-                                                 max_energy=max_energy, max_rotate=max_rotate,
-                                                 bounds=bounds,
-                                                 body_colour=body_colour,
-                                                 leg_colour=leg_colour,
-                                                 horn_colour=horn_colour,
-                                                 size=1, fov=1, eyesight=eyesight,
-                                                 nn_seed=random.randint(0, 1000000),
-                                                 brain=new_brain))
-
-                # print stats
-                fitness_list = [agent.fitness for agent in self.agents]
-                print(f"Max fitness of generation {ui_dict['generation']}: {max(fitness_list)}\n"
-                      f"Average fitness of generation {ui_dict['generation']}: {round(mean(fitness_list), 2)}\n"
-                      f"Median fitness of generation {ui_dict['generation']}: {median(fitness_list)}")
-
-                self.agents = new_agents
-                # set fitness back to 0
-                ui_dict['fitness'] = 0
-                # set status back to False (not doing GA)
-                ui_dict['status'] = False
-
-                # write stats to csv file
-                with open('bug_stats.csv', 'a') as file:
-                    csv_writer = csv.writer(file, delimiter=',', lineterminator='\n')
-                    csv_writer.writerow([ui_dict['generation'],
-                                         max(fitness_list),
-                                         round(mean(fitness_list), 2),
-                                         median(fitness_list)])
-                ui_dict['generation'] += 1
-
-            # update agents
-            ui_dict['num_dead'] = 0
-            for agent in self.agents:
-                # agent.update(None)
-                if not agent.is_dead:
-                    agent.update(None)
-                else:
-                    ui_dict['num_dead'] += 1
+            elif self.render_thread:
+                self.snapshots.publish(self.population, self.agents, ui_dict, self.food_field)
+            self.next_generation(ui_dict)
+            if self.stopped:
+                return
+
+        # update agents
+        timer = self.profiler.start()
+        ui_dict['num_dead'] = self.population.num_dead()
+        alive_indices = self.population.alive_indices()
+        nn_outputs = self.brains.forward(self.population.get_nn_inputs(alive_indices), alive_indices)
+        died = self.population.apply_actions(nn_outputs, alive_indices)
+        if self.render_in_step:
+            # only the sprites need to know, state is already in the population
+            for index in died:
+                self.agents[index].die()
+                # dead bugs never move again, draw them once onto the background
+                agent_surf, surf_location = self.agents[index].draw()
+                self.renderer.stamp(agent_surf, surf_location.get_coords())
+        self.profiler.stop("agent update", timer)
 
+        ui_dict['fitness'] += 1
+        if self.render_in_step and self.frame_due(ui_dict):
+            self.handle_events(ui_dict)
             self.update_screen(ui_dict)
 
-    def update_screen(self, ui_dict):
-        # draw agents
-        for agent in self.agents:
-            agent_surf, surf_location = agent.draw()
-            self.canvas.blit(agent_surf, surf_location.get_coords())
+    def frame_due(self, ui_dict):
+        """Whether a frame should be drawn after the current simulation step"""
+        if self.steps_per_frame is not None:
+            return ui_dict['fitness'] % self.steps_per_frame == 0
+        now = time.perf_counter()
+        if now - self.last_frame_time < 1 / self.fps:
+            return False
+        self.last_frame_time = now
+        return True
+
+    def threaded_loop(self, ui_dict):
+        """Steps the simulation on a background thread while this thread draws the latest snapshot at fps"""
+        self.snapshots = SnapshotBuffer()
+        errors = []
+
+        def simulate():
+            try:
+                while not self.stopped:
+                    self.game_step(ui_dict)
+                    self.snapshots.publish(self.population, self.agents, ui_dict, self.food_field)
+            except Exception as error:
+                errors.append(error)
+
+        simulation_thread = threading.Thread(target=simulate, daemon=True)
+        simulation_thread.start()
+        while simulation_thread.is_alive():
+            self.handle_events(ui_dict)
+            snapshot = self.snapshots.latest()
+            if snapshot.agents is not None:
+                self.draw_snapshot(snapshot)
+            self.clock.tick(self.fps)
+        if errors:
+            raise errors[0]
+
+    def draw_snapshot(self, snapshot):
+        if snapshot.agents is not self.snapshot_agents:
+            # new generation
+            self.renderer.reset()
+            self.snapshot_agents = snapshot.agents
+            self.snapshot_alive = np.ones(len(snapshot.agents), dtype=bool)
+        # grey out bugs that died since the last drawn snapshot and draw them onto the background
+        for index in np.flatnonzero(self.snapshot_alive & ~snapshot.alive):
+            agent = snapshot.agents[index]
+            agent.die()
+            agent_surf, surf_location = agent.sprite.draw_at(utility.Point(*snapshot.positions[index]),
+                                                             snapshot.angles[index])
+            self.renderer.stamp(agent_surf, surf_location.get_coords())
+        np.copyto(self.snapshot_alive, snapshot.alive)
+
+        blit_sequence = list(snapshot.food_blits)
+        for index in np.flatnonzero(snapshot.alive):
+            agent_surf, surf_location = snapshot.agents[index].sprite.draw_at(
+                utility.Point(*snapshot.positions[index]), snapshot.angles[index])
+            blit_sequence.append((agent_surf, surf_location.get_coords()))
+        self.render_frame(blit_sequence, snapshot.ui_dict)
+
+    def plateaued(self):
+        """
+        Whether the best fitness of the last config.plateau_patience generations failed to beat the best fitness
+        of every generation before them by more than config.plateau_min_delta, a tie counts as a plateau
+        """
+        patience = self.config.plateau_patience
+        if patience is None or len(self.history) <= patience:
+            return False
+        best_before = max(stats["max"] for stats in self.history[:-patience])
+        best_recent = max(stats["max"] for stats in self.history[-patience:])
+        return best_recent <= best_before + self.config.plateau_min_delta
+
+    def next_generation(self, ui_dict):
+        # run genetic algorithm on the genomes of the whole population at once
+        timer = self.profiler.start()
+        config = self.config
+        genetic_controller = genetic.BatchGeneticController(self.genome_matrix, self.population.fitness,
+                                                            **config.genetic_settings(),
+                                                            rng=self.streams.ga(ui_dict['generation']))
+        new_genome_matrix = genetic_controller.generate_children(config.verbose)[:len(self.agents)]
+        self.profiler.stop("generate_children", timer)
+        timer = self.profiler.start()
+        new_agents = []
+
+        child_generation = ui_dict['generation'] + 1
+        positions = Engine.initialise_positions(len(self.agents), 80, 920, 80, 920,
+                                                self.streams.positions(child_generation))
+        bug_streams = self.streams.bugs(child_generation, len(self.agents))
+        # children inherit their clipped colours
+        colours = Engine.clip_colours(new_genome_matrix)
+
+        for idx, genome_buffer in enumerate(new_genome_matrix):
+            genome = genetic.BugGenome.from_buffer(genome_buffer, config.architecture)
+            body_colour, leg_colour, horn_colour = colours[idx]
+            # crete new brain for child, its layers are views onto the genome
+            new_brain = NeuralNetwork.BugNN(architecture=config.architecture, brain_genome=genome.get_brain_genes())
+            new_agents.append(agents.Bug(positions[idx], max_speed=config.max_speed,
+                                         max_energy=config.max_energy, max_rotate=config.max_rotate,
+                                         bounds=config.bounds,
+                                         body_colour=body_colour,
+                                         leg_colour=leg_colour,
+                                         horn_colour=horn_colour,
+                                         size=1, fov=1, eyesight=config.eyesight,
+                                         nn_seed=int(bug_streams[idx].integers(0, 1000000)),
+                                         brain=new_brain, genome=genome, rng=bug_streams[idx]))
+
+        # print stats
+        fitness_list = [agent.fitness for agent in self.agents]
+        self.history.append({"generation": ui_dict['generation'], "max": max(fitness_list),
+                             "mean": round(mean(fitness_list), 2), "median": median(fitness_list)})
+        if config.verbose:
+            print(f"Max fitness of generation {ui_dict['generation']}: {max(fitness_list)}\n"
+                  f"Average fitness of generation {ui_dict['generation']}: {round(mean(fitness_list), 2)}\n"
+                  f"Median fitness of generation {ui_dict['generation']}: {median(fitness_list)}")
+        if self.plateaued():
+            self.stopped = True
+            if config.verbose:
+                print(f"Best fitness has not improved by more than {config.plateau_min_delta} "
+                      f"in {config.plateau_patience} generations, stopping.")
+
+        self.agents = new_agents
+        self.genome_matrix = new_genome_matrix
+        self.build_population(child_generation)
+        if self.render_in_step:
+            self.renderer.reset()
+        self.profiler.stop("new agents", timer)
+        # set fitness back to 0
+        ui_dict['fitness'] = 0
+        # set status back to False (not doing GA)
+        ui_dict['status'] = False
+
+        # write stats to csv file
+        if config.stats_path is not None:
+            timer = self.profiler.start()
+            Engine.write_stats(config.stats_path, ui_dict['generation'], fitness_list)
+            self.profiler.stop("write_stats", timer)
+        self.profiler.end_generation(ui_dict['generation'])
+        ui_dict['generation'] += 1
 
+    def update_screen(self, ui_dict):
+        timer = self.profiler.start()
+        # draw food and alive agents, dead ones are part of the renderer's background
+        blit_sequence = [] if self.food_field is None else self.food_field.draw()
+        for index in self.population.alive_indices():
+            agent_surf, surf_location = self.agents[index].draw()
+            blit_sequence.append((agent_surf, surf_location.get_coords()))
+        self.render_frame(blit_sequence, ui_dict)
+        self.profiler.stop("update_screen", timer)
+        # frame rate only caps the simulation when it is tied to drawing
+        self.clock.tick(self.fps if self.steps_per_frame is not None else 0)
+
+    def render_frame(self, blit_sequence, ui_dict):
         # update UI every ui_ratio frames
-        if ui_dict['fitness'] % self.ui_ratio == 0:
+        if self.frames % self.ui_ratio == 0:
+            timer = self.profiler.start()
             self.ui.update(['game'], ui_dict)
+            self.profiler.stop("ui.update", timer)
 
-        ui_surf, ui_location = self.ui.draw()
-        self.canvas.blit(ui_surf, ui_location)
-
-        ui_dict['fitness'] += 1
-
-        pygame.display.flip()
-        self.clock.tick(self.fps)
+        blit_sequence.append(self.ui.draw())
+        self.frames += 1
+        self.renderer.render(blit_sequence)
 
     def draw_box(self, width, height, colour, alpha=255):
         box_surface = pygame.Surface((width, height))
@@ -203,69 +488,67 @@ class Engine:
         return box_surface
 
 
-flip_rate = 0.0005
-swap_rate = 0.0008
-shuffle_rate = 0.001
-reverse_rate = 0.001
-noise_rate = 0.009
-noise_sd = 0.1
-
-max_speed = 2
-max_energy = 400
-max_rotate = math.pi / 100
-bounds = ((10, 990), (10, 990))
-eyesight = 35
-
-architecture = architecture = [
-    {"inputs": 6, "outputs": 5, "activation": "relu"},
-    {"inputs": 5, "outputs": 4, "activation": "relu"},
-    {"inputs": 4, "outputs": 5, "activation": "relu"}
-]
-
-screen_size = (1310, 1000) # x, y
-test_ui = ui_module.UI(1000, 0, 310, 100,
-                      border_colour=(0, 120, 0))
-test_engine = Engine(screen_size, (0, 0, 0), 60, test_ui, ui_fps=30)
-
-num_bugs = 400
-
-for i in range(num_bugs):
-    test_engine.add_agent(agents.Bug(utility.Point(500, 500), max_speed=max_speed,
-                                     max_energy=max_energy, max_rotate=max_rotate,
-                                     bounds=bounds,
-                                     body_colour=(random.randint(80, 210),
-                                                  random.randint(80, 210),
-                                                  random.randint(80, 210)),
-                                     leg_colour=(random.randint(80, 210),
-                                                 random.randint(80, 210),
-                                                 random.randint(80, 210)),
-                                     horn_colour=(random.randint(80, 210),
-                                                  random.randint(80, 210),
-                                                  random.randint(80, 210)),
-                                     size=1, fov=1, eyesight=eyesight,
-                                     nn_seed=random.randint(0, 1000000),
-                                     architecture=architecture))
-
-# with open('single_dir_25_sight/agents_1338.agents', 'rb') as file:
-#     loaded_agents = pickle.load(file)
-#     test_engine.load(loaded_agents)
-
-test_engine.start()
-ui_font = pygame.font.SysFont("lucidaconsole", 18)
-fps_element = ui_module.UI_fps(10, 10, 300, 20, (0, 255, 0),
-                               ui_font,
-                               test_engine.clock)
-status_element = ui_module.UI_status(10, 30, 300, 20, (0, 255, 0),
-                                     ui_font)
-alive_element = ui_module.UI_alive(10, 50, 300, 20, (0, 255, 0),
-                                   ui_font,
-                                   num_bugs)
-fitness_element = ui_module.UI_fitness(10, 70, 300, 20, (0, 255, 0),
-                                       ui_font)
-
-# test_ui.add_element(["game"], fps_element)
-test_ui.add_elements(["game"], [fps_element, status_element, alive_element, fitness_element])
-test_engine.game_loop()
+if __name__ == "__main__":
+    # run without a window (no rendering, no frame rate cap) with --headless
+    headless = "--headless" in sys.argv
+    # evaluate each generation across N processes with --workers N (headless only)
+    workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else 0
+    # draw a frame every N simulation steps with --steps-per-frame N, 0 to step as fast as possible
+    steps_per_frame = int(sys.argv[sys.argv.index("--steps-per-frame") + 1]) if "--steps-per-frame" in sys.argv else 1
+    steps_per_frame = steps_per_frame if steps_per_frame > 0 else None
+    # step simulation on a background thread, drawing at display fps with --render-thread
+    render_thread = "--render-thread" in sys.argv
+    # time each phase of the game loop with --profile path, shown on the UI and dumped to path every generation
+    profile_path = sys.argv[sys.argv.index("--profile") + 1] if "--profile" in sys.argv else None
+    test_config = ExperimentConfig(
+        # cast fov rays to see walls, food and other bugs with --vision
+        vision="--vision" in sys.argv,
+        # spread N food items over the field with --food N
+        num_food=int(sys.argv[sys.argv.index("--food") + 1]) if "--food" in sys.argv else 0,
+        # regrow R food items per tick with --food-regrowth R, pair with --max-ticks as bugs can then live forever
+        food_regrowth_rate=float(sys.argv[sys.argv.index("--food-regrowth") + 1])
+        if "--food-regrowth" in sys.argv else 0,
+        # reproduce a run with --seed N
+        seed=int(sys.argv[sys.argv.index("--seed") + 1]) if "--seed" in sys.argv else None,
+        # end a generation after N ticks with --max-ticks N
+        max_ticks=int(sys.argv[sys.argv.index("--max-ticks") + 1]) if "--max-ticks" in sys.argv else None,
+        # end a generation once fewer than X of the bugs are alive with --min-alive X
+        min_alive_fraction=float(sys.argv[sys.argv.index("--min-alive") + 1]) if "--min-alive" in sys.argv else None,
+        # stop the run once best fitness has not improved by D in N generations with --patience N [--min-delta D]
+        plateau_patience=int(sys.argv[sys.argv.index("--patience") + 1]) if "--patience" in sys.argv else None,
+        plateau_min_delta=float(sys.argv[sys.argv.index("--min-delta") + 1]) if "--min-delta" in sys.argv else 0)
+
+    screen_size = (1310, 1000) # x, y
+    test_profiler = Profiler(filepath=profile_path) if profile_path is not None else None
+    test_ui = None if headless else ui_module.UI(1000, 0, 310, 100 if test_profiler is None else 290,
+                                                  border_colour=(0, 120, 0))
+    test_engine = Engine(screen_size, (0, 0, 0), 60, test_ui, ui_fps=30, config=test_config, headless=headless,
+                         workers=workers, steps_per_frame=steps_per_frame, render_thread=render_thread,
+                         profiler=test_profiler)
+    test_engine.spawn_agents()
+
+    # test_engine.load('single_dir_25_sight/agents_1338.agents')
+
+    test_engine.start()
+    if not headless:
+        ui_font = pygame.font.SysFont("lucidaconsole", 18)
+        fps_element = ui_module.UI_fps(10, 10, 300, 20, (0, 255, 0),
+                                       ui_font,
+                                       test_engine.clock)
+        status_element = ui_module.UI_status(10, 30, 300, 20, (0, 255, 0),
+                                             ui_font)
+        alive_element = ui_module.UI_alive(10, 50, 300, 20, (0, 255, 0),
+                                           ui_font,
+                                           test_config.num_bugs)
+        fitness_element = ui_module.UI_fitness(10, 70, 300, 20, (0, 255, 0),
+                                               ui_font)
+
+        # test_ui.add_element(["game"], fps_element)
+        test_ui.add_elements(["game"], [fps_element, status_element, alive_element, fitness_element])
+        if test_profiler is not None:
+            test_ui.add_element(["game"], ui_module.UI_profile(10, 100, 300, 180, (0, 255, 0),
+                                                               ui_font, test_profiler))
+    test_engine.game_loop()
 
 
 
@@ -0,0 +1,80 @@
+"""
+Programmatic headless runs, for driving the engine from scripts and worker processes:
+
+    from config import ExperimentConfig
+    from experiment import Experiment
+
+    experiment = Experiment(ExperimentConfig(noise_rate=0.015, seed=1, stats_path=None, verbose=False))
+    history = experiment.run(generations=20)
+"""
+from config import ExperimentConfig
+from engine import Engine
+
+
+class Experiment:
+    """One headless evolution run of an ExperimentConfig, no window, mixer or fonts are started"""
+    def __init__(self, config=None, workers=0, profiler=None, checkpoint=None):
+        """
+        :ExperimentConfig config: Settings of the run, defaults if None
+        :int workers: Number of worker processes each generation is split across, 0 to run in this process
+        :Profiler profiler: Records time spent in each phase, disabled if None
+        :str checkpoint: Path of population checkpoint to start from, random first generation if None
+        """
+        self.config = config if config is not None else ExperimentConfig()
+        self.engine = Engine((0, 0), (0, 0, 0), 60, None, ui_fps=30, config=self.config, headless=True,
+                             workers=workers, profiler=profiler)
+        self.engine.spawn_agents()
+        if checkpoint is not None:
+            self.engine.load(checkpoint)
+        self.engine.start()
+        self.ui_dict = self.engine.begin()
+
+    @property
+    def history(self):
+        """Max, mean and median fitness of every finished generation"""
+        return self.engine.history
+
+    def stats(self):
+        """
+        :return: dict of generation, ticks simulated, number of bugs alive and max fitness of the current generation,
+                 and whether a termination policy stopped the run
+        """
+        population = self.engine.population
+        return {"generation": self.ui_dict['generation'], "tick": self.ui_dict['fitness'],
+                "num_alive": int(population.alive.sum()), "max_fitness": int(population.fitness.max()),
+                "stopped": self.engine.stopped}
+
+    def step(self, num_steps=1):
+        """
+        Simulates num_steps ticks, starting the next generation whenever the current one ends,
+        fewer if a termination policy stops the run
+        :int num_steps: Number of ticks to simulate
+        :return: stats after the last tick
+        """
+        if self.engine.evaluator is not None:
+            raise Exception("Parallel experiments run whole generations, use run instead of step.")
+        for _ in range(num_steps):
+            if self.engine.stopped:
+                break
+            self.engine.game_step(self.ui_dict)
+        return self.stats()
+
+    def run(self, generations):
+        """
+        Simulates until generations more generations have finished, or a termination policy stops the run
+        :int generations: Number of generations to finish
+        :return: List of max, mean and median fitness of each generation finished by this call
+        """
+        start = len(self.engine.history)
+        while len(self.engine.history) < start + generations and not self.engine.stopped:
+            if self.engine.evaluator is not None:
+                self.engine.parallel_step(self.ui_dict)
+            else:
+                self.engine.game_step(self.ui_dict)
+        return self.engine.history[start:]
+
+    def close(self):
+        """Stops the worker pool of a parallel experiment"""
+        if self.engine.evaluator is not None:
+            self.engine.evaluator.close()
+            self.engine.evaluator = None
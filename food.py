@@ -0,0 +1,183 @@
+import numpy as np
+import pygame
+from spatial import SpatialGrid
+from utility import LRUCache
+
+
+class FoodField:
+    """
+    Structure-of-arrays store of every food item on the field, one row per item.
+    Eating is resolved for all bugs at once through a spatial query, eaten items are freed for regrowth.
+    """
+    # where new items appear: anywhere on the field, or around a few fixed cluster centres
+    policies = ("uniform", "clusters")
+    # one surface per (size, colour) of food, shared by every item and field
+    surface_cache = LRUCache(64)
+
+    def __init__(self, bounds, capacity, initial=None, amount=1, bite=1, regrowth_rate=0,
+                 policy="uniform", num_clusters=8, cluster_sd=40, size=4, colour=(0, 200, 0), eat_radius=10,
+                 rng=None):
+        """
+        :((int, int), (int, int)) bounds: (x_low, x_high), (y_low, y_high) of the field
+        :int capacity: Maximum number of items on the field at once
+        :int initial: Number of items spawned by reset, capacity if None
+        :float amount: Amount of food in a new item
+        :float bite: Amount of food a bug eats from an item per tick
+        :float regrowth_rate: Number of items spawned per tick, fractions carry over to later ticks
+        :str policy: Where items spawn, one of FoodField.policies
+        :int num_clusters: Number of cluster centres of the "clusters" policy
+        :float cluster_sd: Standard deviation of item distance from its cluster centre
+        :int size: Edge length of the square drawn for an item
+        :(int, int, int) colour: Colour of items
+        :float eat_radius: Distance from a bug's midpoint within which it eats an item
+        :np.random.Generator rng: Stream cluster centres and items are drawn from until reset is given another,
+                                  fresh entropy if None
+        """
+        if policy not in FoodField.policies:
+            raise Exception(f"Unknown food policy {policy}, choose from {FoodField.policies}.")
+        self.bounds = bounds
+        self.capacity = capacity
+        self.initial = capacity if initial is None else min(initial, capacity)
+        self.amount = amount
+        self.bite = bite
+        self.regrowth_rate = regrowth_rate
+        self.policy = policy
+        self.cluster_sd = cluster_sd
+        self.size = size
+        self.colour = colour
+        self.eat_radius = eat_radius
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.num_clusters = num_clusters
+        self.cluster_centres = self.place_clusters()
+        self.positions = np.zeros((capacity, 2), dtype=np.float64)
+        self.amounts = np.zeros(capacity, dtype=np.float64)
+        self.active = np.zeros(capacity, dtype=bool)
+        # fraction of an item carried over between ticks by regrow
+        self.regrowth_credit = 0.0
+        # index of active items, rebuilt lazily after items are spawned or eaten
+        self.grid = SpatialGrid(bounds, max(eat_radius, 1))
+        self.grid_is_stale = True
+
+    def __len__(self):
+        return int(np.count_nonzero(self.active))
+
+    def place_clusters(self):
+        """
+        :return: (num_clusters, 2) cluster centres drawn from the current stream
+        """
+        (x_low, x_high), (y_low, y_high) = self.bounds
+        return np.column_stack((self.rng.uniform(x_low, x_high, self.num_clusters),
+                                self.rng.uniform(y_low, y_high, self.num_clusters)))
+
+    def reset(self, rng=None):
+        """
+        Removes every item and spawns the initial ones, e.g. at the start of a generation
+        :np.random.Generator rng: Stream to place clusters and spawn items from from now on, current stream if None.
+                                  Cluster centres are only redrawn when a new stream is given.
+        """
+        if rng is not None:
+            self.rng = rng
+            self.cluster_centres = self.place_clusters()
+        self.active[:] = False
+        self.amounts[:] = 0
+        self.regrowth_credit = 0.0
+        self.spawn(self.initial)
+        self.update_grid()
+
+    def spawn_positions(self, num_items):
+        """
+        :int num_items: Number of positions to generate
+        :return: (num_items, 2) positions of new items according to the spawn policy, within bounds
+        """
+        (x_low, x_high), (y_low, y_high) = self.bounds
+        if self.policy == "uniform":
+            positions = np.column_stack((self.rng.uniform(x_low, x_high, num_items),
+                                         self.rng.uniform(y_low, y_high, num_items)))
+        else:
+            centres = self.cluster_centres[self.rng.integers(0, len(self.cluster_centres), num_items)]
+            positions = centres + self.rng.normal(0, self.cluster_sd, (num_items, 2))
+        positions[:, 0] = np.clip(positions[:, 0], x_low, x_high)
+        positions[:, 1] = np.clip(positions[:, 1], y_low, y_high)
+        return positions
+
+    def spawn(self, num_items):
+        """
+        Spawns items into free rows
+        :int num_items: Number of items to spawn, limited by free capacity
+        :return: Rows of spawned items
+        """
+        rows = np.flatnonzero(~self.active)[:num_items]
+        if len(rows):
+            self.positions[rows] = self.spawn_positions(len(rows))
+            self.amounts[rows] = self.amount
+            self.active[rows] = True
+            self.grid_is_stale = True
+        return rows
+
+    def regrow(self):
+        """Spawns regrowth_rate items per call on average, call once per tick"""
+        self.regrowth_credit += self.regrowth_rate
+        num_items = int(self.regrowth_credit)
+        self.regrowth_credit -= num_items
+        return self.spawn(num_items)
+
+    def update_grid(self):
+        if self.grid_is_stale:
+            rows = np.flatnonzero(self.active)
+            self.grid.rebuild(self.positions[rows], rows)
+            self.grid_is_stale = False
+
+    def feed(self, population, rows):
+        """
+        Lets bugs eat the items within eat_radius. Every item is eaten by at most its closest bug and every bug
+        eats at most its closest item per tick. Eaters gain population.food_energy per unit of food and pay
+        population.eat_cost, up to max_energy.
+        :Population population: Population the bugs belong to
+        :np.ndarray rows: Indices of bugs that can eat
+        :return: Rows of bugs that ate and rows of the items they ate
+        """
+        self.update_grid()
+        query_indices, items, distances = self.grid.query_many(population.positions[rows], self.eat_radius)
+        if len(items) == 0:
+            return rows[:0], items
+        eaters = rows[query_indices]
+        # closest bug of each item, then closest of those items for each bug
+        by_item = np.lexsort((distances, items))
+        first = np.ones(len(by_item), dtype=bool)
+        first[1:] = items[by_item][1:] != items[by_item][:-1]
+        winners = by_item[first]
+        by_eater = winners[np.lexsort((distances[winners], eaters[winners]))]
+        first = np.ones(len(by_eater), dtype=bool)
+        first[1:] = eaters[by_eater][1:] != eaters[by_eater][:-1]
+        eaters, items = eaters[by_eater[first]], items[by_eater[first]]
+
+        eaten = np.minimum(self.bite, self.amounts[items])
+        self.amounts[items] -= eaten
+        population.energy[eaters] = np.minimum(
+            population.energy[eaters] + population.food_energy * eaten - population.eat_cost, population.max_energy)
+        finished = items[self.amounts[items] <= 0]
+        if len(finished):
+            self.active[finished] = False
+            self.grid_is_stale = True
+        return eaters, items
+
+    def update(self, population, rows):
+        """Feeds the given bugs and regrows items, call once per tick"""
+        eaten = self.feed(population, rows)
+        self.regrow()
+        self.update_grid()
+        return eaten
+
+    def get_surface(self):
+        """Returns the surface shared by every item of this size and colour"""
+        def render():
+            surface = pygame.Surface((self.size, self.size))
+            surface.fill(self.colour)
+            return surface
+        return FoodField.surface_cache.get((self.size, tuple(self.colour)), render)
+
+    def draw(self):
+        """Returns blit sequence of every active item"""
+        surface = self.get_surface()
+        half_size = self.size / 2
+        return [(surface, (x - half_size, y - half_size)) for x, y in self.positions[self.active].tolist()]
@@ -1,20 +1,54 @@
 import struct
-import math
-import random
 import numpy as np
 
 
 class BugGenome:
+    """
+    Genome of a bug stored in a single float32 buffer: colour genes, then weight genes, then bias genes.
+    Segment getters return views onto the buffer, not copies.
+    """
+    num_colour_genes = 9
+
+    @staticmethod
+    def segment_lengths(architecture):
+        """
+        :[dict] architecture: Architecture of BugNN
+        :return: Number of colour, weight and bias genes of a genome for this architecture
+        """
+        num_weights = sum(layer_desc["inputs"] * layer_desc["outputs"] for layer_desc in architecture)
+        num_biases = sum(layer_desc["outputs"] for layer_desc in architecture)
+        return BugGenome.num_colour_genes, num_weights, num_biases
+
+    @classmethod
+    def from_buffer(cls, buffer, architecture):
+        """
+        Creates genome on top of an existing buffer without copying it, e.g. a row of a genome matrix
+        :np.ndarray buffer: float32 array of genes
+        :[dict] architecture: Architecture of BugNN, used to find the segments
+        :return: BugGenome viewing buffer
+        """
+        genome = cls.__new__(cls)
+        genome.genome = buffer
+        genome.set_segments(*BugGenome.segment_lengths(architecture))
+        return genome
+
     @classmethod
     def new_from_genome(cls, genome):
-        colours, weights, biases = genome.get_colour_genes(), genome.get_weight_genes(), genome.get_bias_genes()
-        return cls(colours, weights, biases)
+        new_genome = cls.__new__(cls)
+        new_genome.genome = genome.genome.copy()
+        new_genome.set_segments(*(upper - lower for lower, upper in genome.get_segment_bounds()))
+        return new_genome
 
     def __init__(self, colours, weights, biases):
-        self.genome = colours + weights + biases
-        self.colour_segment = (0, len(colours))
-        self.weight_segment = (len(colours), len(colours) + len(weights))
-        self.bias_segment = (len(self.genome) - len(biases), len(self.genome))
+        self.genome = np.concatenate([np.asarray(colours, dtype=np.float32),
+                                      np.asarray(weights, dtype=np.float32),
+                                      np.asarray(biases, dtype=np.float32)])
+        self.set_segments(len(colours), len(weights), len(biases))
+
+    def set_segments(self, num_colours, num_weights, num_biases):
+        self.colour_segment = (0, num_colours)
+        self.weight_segment = (num_colours, num_colours + num_weights)
+        self.bias_segment = (num_colours + num_weights, num_colours + num_weights + num_biases)
 
     def get_gene(self, position):
         return self.genome[position]
@@ -31,6 +65,10 @@ class BugGenome:
     def get_bias_genes(self):
         return self.genome[self.bias_segment[0]:self.bias_segment[1]]
 
+    def get_brain_genes(self):
+        """Weight genes followed by bias genes, the layout BugNN expects"""
+        return self.genome[self.weight_segment[0]:self.bias_segment[1]]
+
     def get_gene_segment(self, lower, upper):
         return self.genome[lower:upper]
 
@@ -42,18 +80,16 @@ class BugGenome:
 
     def check_NaN(self, default=0):
         """Check if any gene is NaN, changes it to default value if it is"""
-        for i, gene in enumerate(self.genome):
-            if math.isnan(gene):
-                self.genome[i] = default
+        self.genome[np.isnan(self.genome)] = default
 
     def __len__(self):
         return len(self.genome)
 
     def __eq__(self, other):
-        return self.genome == other.genome
+        return np.array_equal(self.genome, other.genome)
 
     def __str__(self):
-        return str(self.genome)
+        return str(self.genome.tolist())
 
 
 class GeneticController:
@@ -80,7 +116,7 @@ class GeneticController:
     def __init__(self, population, flip_rate=0.0, swap_rate=0.0,
                  shuffle_rate=0.0, shuffle_size=(2, 6),
                  reverse_rate=0.0, reverse_size=(2, 6),
-                 noise_rate=0.0, noise_sd=1.0, noise_mean=0.0):
+                 noise_rate=0.0, noise_sd=1.0, noise_mean=0.0, rng=None):
         """
         :param population: List of (individual genomes, fitness)
         :float flip_rate: Rate of bitflip mutation (per gene)
@@ -92,6 +128,7 @@ class GeneticController:
         :float noise_rate: Rate of noise added mutation (per gene)
         :float noise_sd: Variance of gaussian distribution noise is sampled from
         :float noise_mean: Mean of gaussian distribution noise is sampled from
+        :np.random.Generator rng: Stream every random choice is drawn from, fresh entropy if None
         """
         self.population = sorted(population, key=lambda x: x[1], reverse=True)
         self.flip_rate = flip_rate
@@ -103,6 +140,7 @@ class GeneticController:
         self.noise_rate = noise_rate
         self.noise_sd = noise_sd
         self.noise_mean = noise_mean
+        self.rng = rng if rng is not None else np.random.default_rng()
 
     def generate_children(self):
         print("Performing parent selection.")
@@ -113,62 +151,56 @@ class GeneticController:
         mutated_children = [(self.mutate(child[0]), child[1]) for child in children]
         return mutated_children
 
-    def sus_selection(self):
+    @staticmethod
+    def sus_indices(fitness, rng):
         """
         Selects and pairs up suitable mates with SUS algorithm
-        :return: List of pairs of mates
+        :np.ndarray fitness: Fitness of every individual, sorted in descending order
+        :np.random.Generator rng: Stream to draw random choices from
+        :return: Arrays of indices of mate A and mate B of each pair, ordered by the index of the fitter mate
         """
-        total_fitness = sum(f for (_, f) in self.population)
-        num_individuals = len(self.population)
+        cumulative_fitness = np.cumsum(fitness, dtype=np.float64)
+        total_fitness = cumulative_fitness[-1]
+        num_individuals = len(fitness)
         step = total_fitness / num_individuals
-        # starting fitness
-        start_f = random.random() * step
-        # get list of all fitnesses that are selected
-        f_list = [start_f + i * step for i in range(num_individuals)]
-        # second pass of sus algorithm to pick N more (2N parents for N children)
-        start_f_2 = random.random() * step
-        f_list.extend([start_f_2 + i * step for i in range(num_individuals)])
-        f_list.sort()
-
-        # get individuals that are selected
-        keep = {} # dictionary of index of chosen individuals and number of times they appear
-        i = 0
-        for f in f_list:
-            while sum(f for (_, f) in self.population[:i+1]) < f:
-                i += 1
-            if i in keep:
-                keep[i] += 1
-            else:
-                keep[i] = 1
-
-        # pair them up
-        pair_list = []
-        keep_list = [[k, v] for k, v in keep.items()]
-        while len(keep_list) > 0:
-            mate_a = keep_list[0][0]
-            # check if mate_a is the only mate left, if so, choose one random individual to mate with
-            if len(keep_list) > 1:
-                mate_b_index = random.randrange(1, len(keep_list))
-                mate_b = keep_list[mate_b_index][0]
-                # remove one instance of mate_b from the pool
-                keep_list[mate_b_index][1] -= 1
-                if keep_list[mate_b_index][1] == 0:
-                    keep_list.pop(mate_b_index)
-                pair_list.append((self.population[mate_a][0],
-                                  self.population[mate_b][0]))
-            else:
-                other_mate = random.randrange(0, len(self.population))
-                while other_mate == mate_a:
-                    other_mate = self.population[random.randrange(0, len(self.population))][0]
-                pair_list.append((self.population[mate_a][0],
-                                  self.population[other_mate][0]))
-
-            # remove one instance of mate_a from the pool
-            keep_list[0][1] -= 1
-            if keep_list[0][1] == 0:
-                keep_list.pop(0)
+        # two passes of sus algorithm pick 2N parents for N children, each with its own starting fitness
+        offsets = np.arange(num_individuals) * step
+        f_list = np.concatenate([rng.random() * step + offsets,
+                                 rng.random() * step + offsets])
+
+        # index of first individual whose cumulative fitness reaches each selected fitness
+        selected = np.searchsorted(cumulative_fitness, f_list, side='left')
+        np.minimum(selected, num_individuals - 1, out=selected)
+
+        # pair them up in random order
+        rng.shuffle(selected)
+        mates_a, mates_b = selected[0::2], selected[1::2]
+        # individuals paired with themselves swap mates with a random other pair
+        for i in np.flatnonzero(mates_a == mates_b):
+            if mates_a[i] != mates_b[i]:
+                # already fixed by an earlier swap
+                continue
+            j = rng.integers(0, num_individuals)
+            if mates_a[j] != mates_b[i] and mates_a[i] != mates_b[j]:
+                mates_b[i], mates_b[j] = mates_b[j], mates_b[i]
+            elif num_individuals > 1:
+                # no suitable pair to swap with, choose one random individual to mate with
+                other_mate = rng.integers(0, num_individuals)
+                while other_mate == mates_a[i]:
+                    other_mate = rng.integers(0, num_individuals)
+                mates_b[i] = other_mate
+        # list pairs by their fitter parent, children at the end of the list are bred from the weakest parents
+        order = np.argsort(np.minimum(mates_a, mates_b), kind='stable')
+        return mates_a[order], mates_b[order]
 
-        return pair_list
+    def sus_selection(self):
+        """
+        Selects and pairs up suitable mates with SUS algorithm
+        :return: List of pairs of mates
+        """
+        mates_a, mates_b = GeneticController.sus_indices(np.array([f for (_, f) in self.population]), self.rng)
+        return [(self.population[mate_a][0], self.population[mate_b][0])
+                for mate_a, mate_b in zip(mates_a.tolist(), mates_b.tolist())]
 
     def crossover(self, parent_a, parent_b):
         """
@@ -179,8 +211,9 @@ class GeneticController:
         """
         # assign parents to random genes, 50-50 split
         num_genes = len(parent_a)
-        random.shuffle(parents := [parent_a, parent_b])
-        random.shuffle(random_gene_list := list(range(num_genes)))
+        parents = [parent_a, parent_b]
+        self.rng.shuffle(parents)
+        random_gene_list = self.rng.permutation(num_genes).tolist()
         assignments = {}
         split_index = (num_genes + 1) // 2
         for i in range(split_index):
@@ -207,12 +240,12 @@ class GeneticController:
         # gene mutations
         for i in range(genome_length):
             curr_gene = new_genome.get_gene(i)
-            if np.random.rand() < self.noise_rate:
-                curr_gene += np.random.normal(self.noise_mean, self.noise_sd)
-            if np.random.rand() < self.flip_rate:
-                curr_gene = GeneticController.bitflip(curr_gene, np.random.randint(0, 32))
-            if np.random.rand() < self.swap_rate:
-                swap_index = np.random.randint(0, genome_length)
+            if self.rng.random() < self.noise_rate:
+                curr_gene += self.rng.normal(self.noise_mean, self.noise_sd)
+            if self.rng.random() < self.flip_rate:
+                curr_gene = GeneticController.bitflip(curr_gene, self.rng.integers(0, 32))
+            if self.rng.random() < self.swap_rate:
+                swap_index = self.rng.integers(0, genome_length)
                 swap_gene = new_genome.get_gene(swap_index)
                 new_genome.set_gene(i, swap_gene)
                 new_genome.set_gene(swap_index, curr_gene)
@@ -220,17 +253,18 @@ class GeneticController:
                 new_genome.set_gene(i, curr_gene)
 
         # sequence mutations
-        if np.random.rand() < self.shuffle_rate:
-            shuffle_size = np.random.randint(*self.shuffle_size)
-            shuffle_start = np.random.randint(0, genome_length - shuffle_size + 1)
-            np.random.shuffle(
+        if self.rng.random() < self.shuffle_rate:
+            shuffle_size = self.rng.integers(*self.shuffle_size)
+            shuffle_start = self.rng.integers(0, genome_length - shuffle_size + 1)
+            self.rng.shuffle(
                 shuffled_segment := new_genome.get_gene_segment(shuffle_start, shuffle_start + shuffle_size)
             )
             new_genome.set_gene_segment(shuffle_start, shuffle_start + shuffle_size, shuffled_segment)
-        elif np.random.rand() < self.reverse_rate:
-            reverse_size = np.random.randint(*self.reverse_size)
-            reverse_start = np.random.randint(0, genome_length - reverse_size + 1)
-            reversed_segment = reversed(new_genome.get_gene_segment(reverse_start, reverse_start + reverse_size))
+        elif self.rng.random() < self.reverse_rate:
+            reverse_size = self.rng.integers(*self.reverse_size)
+            reverse_start = self.rng.integers(0, genome_length - reverse_size + 1)
+            # copy, as the segment is a view onto the genome being overwritten
+            reversed_segment = new_genome.get_gene_segment(reverse_start, reverse_start + reverse_size)[::-1].copy()
             new_genome.set_gene_segment(reverse_start, reverse_start + reverse_size, reversed_segment)
 
         # check if any mutation caused gene to become NaN
@@ -239,5 +273,134 @@ class GeneticController:
         return new_genome
 
 
+class BatchGeneticController:
+    """
+    Genetic algorithm over a whole population at once.
+    The population is an (N, genome_len) float32 matrix, selection, crossover and every
+    mutation of GeneticController are applied to all children with array operations.
+    """
+    def __init__(self, genomes, fitness, flip_rate=0.0, swap_rate=0.0,
+                 shuffle_rate=0.0, shuffle_size=(2, 6),
+                 reverse_rate=0.0, reverse_size=(2, 6),
+                 noise_rate=0.0, noise_sd=1.0, noise_mean=0.0, rng=None):
+        """
+        :np.ndarray genomes: (N, genome_len) matrix of genomes, one row per individual
+        :np.ndarray fitness: Fitness of each individual
+        :np.random.Generator rng: Stream every random choice is drawn from, fresh entropy if None
+        Mutation rates are the same as GeneticController.
+        """
+        order = np.argsort(-np.asarray(fitness), kind='stable')
+        self.genomes = np.asarray(genomes, dtype=np.float32)[order]
+        self.fitness = np.asarray(fitness)[order]
+        self.flip_rate = flip_rate
+        self.swap_rate = swap_rate
+        self.shuffle_rate = shuffle_rate
+        self.shuffle_size = shuffle_size
+        self.reverse_rate = reverse_rate
+        self.reverse_size = reverse_size
+        self.noise_rate = noise_rate
+        self.noise_sd = noise_sd
+        self.noise_mean = noise_mean
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def generate_children(self, verbose=True):
+        """
+        :bool verbose: Print each step
+        :return: (N, genome_len) float32 matrix of mutated children
+        """
+        if verbose:
+            print("Performing parent selection.")
+        mates_a, mates_b = GeneticController.sus_indices(self.fitness, self.rng)
+        if verbose:
+            print("Performing crossover.")
+        children = BatchGeneticController.crossover(self.genomes[mates_a], self.genomes[mates_b], self.rng)
+        if verbose:
+            print("Mutating genomes.")
+        self.mutate(children)
+        return children
+
+    @staticmethod
+    def crossover(parents_a, parents_b, rng):
+        """
+        Child i takes a random half of its genes from parents_a[i] and the rest from parents_b[i]
+        :np.ndarray parents_a: (N, genome_len) matrix of genomes of parent A
+        :np.ndarray parents_b: (N, genome_len) matrix of genomes of parent B
+        :np.random.Generator rng: Stream to draw random choices from
+        :return: (N, genome_len) matrix of children
+        """
+        num_children, num_genes = parents_a.shape
+        # randomly choose which parent gets the larger half, as GeneticController.crossover does
+        a_first = rng.random(num_children) < 0.5
+        first = np.where(a_first[:, np.newaxis], parents_a, parents_b)
+        second = np.where(a_first[:, np.newaxis], parents_b, parents_a)
+        # assign a random half of the genes of each child to its first parent
+        split_index = (num_genes + 1) // 2
+        first_genes = np.argsort(rng.random((num_children, num_genes)), axis=1)[:, :split_index]
+        mask = np.zeros((num_children, num_genes), dtype=bool)
+        np.put_along_axis(mask, first_genes, True, axis=1)
+        return np.where(mask, first, second)
 
+    @staticmethod
+    def segment_indices(genome_length, num_segments, size_bounds, rng):
+        """
+        Random segments for sequence mutations
+        :int genome_length: Number of genes in each genome
+        :int num_segments: Number of segments to generate
+        :(int, int) size_bounds: Lower and upper bound (exclusive) of segment size
+        :np.random.Generator rng: Stream to draw segments from
+        :return: (num_segments, max_size) arrays of segment offsets, validity mask, segment sizes and starts
+        """
+        sizes = rng.integers(*size_bounds, size=num_segments)
+        starts = np.floor(rng.random(num_segments) * (genome_length - sizes + 1)).astype(np.int64)
+        offsets = np.arange(size_bounds[1] - 1)[np.newaxis, :]
+        valid = offsets < sizes[:, np.newaxis]
+        return offsets, valid, sizes, starts
 
+    def mutate(self, genomes):
+        """
+        Mutates genomes in place
+        :np.ndarray genomes: (N, genome_len) float32 matrix of genomes
+        """
+        num_genomes, genome_length = genomes.shape
+
+        # gene mutations
+        noise_mask = self.rng.random(genomes.shape) < self.noise_rate
+        genomes[noise_mask] += self.rng.normal(self.noise_mean, self.noise_sd,
+                                                np.count_nonzero(noise_mask)).astype(np.float32)
+        flip_mask = self.rng.random(genomes.shape) < self.flip_rate
+        flip_bits = self.rng.integers(0, 32, np.count_nonzero(flip_mask)).astype(np.uint32)
+        genomes.view(np.uint32)[flip_mask] ^= np.left_shift(np.uint32(1), flip_bits)
+        swap_rows, swap_genes = np.nonzero(self.rng.random(genomes.shape) < self.swap_rate)
+        swap_targets = self.rng.integers(0, genome_length, len(swap_rows))
+        # swaps of the same row can share genes, those are applied one by one in gene order like GeneticController
+        swaps_per_row = np.bincount(swap_rows, minlength=num_genomes)
+        single = swaps_per_row[swap_rows] == 1
+        rows, genes, targets = swap_rows[single], swap_genes[single], swap_targets[single]
+        genomes[rows, genes], genomes[rows, targets] = genomes[rows, targets], genomes[rows, genes]
+        for row, gene, target in zip(swap_rows[~single], swap_genes[~single], swap_targets[~single]):
+            genomes[row, gene], genomes[row, target] = genomes[row, target], genomes[row, gene]
+
+        # sequence mutations, a genome is either shuffled or reversed
+        shuffle_rows = self.rng.random(num_genomes) < self.shuffle_rate
+        reverse_rows = np.flatnonzero(~shuffle_rows & (self.rng.random(num_genomes) < self.reverse_rate))
+        shuffle_rows = np.flatnonzero(shuffle_rows)
+        if shuffle_rows.size > 0:
+            offsets, valid, sizes, starts = BatchGeneticController.segment_indices(
+                genome_length, shuffle_rows.size, self.shuffle_size, self.rng)
+            # random permutation of offsets within each segment
+            permutation = np.argsort(np.where(valid, self.rng.random(valid.shape), np.inf), axis=1)
+            rows = np.broadcast_to(shuffle_rows[:, np.newaxis], valid.shape)
+            targets = starts[:, np.newaxis] + offsets
+            sources = starts[:, np.newaxis] + permutation
+            genomes[rows[valid], targets[valid]] = genomes[rows[valid], sources[valid]]
+        if reverse_rows.size > 0:
+            offsets, valid, sizes, starts = BatchGeneticController.segment_indices(
+                genome_length, reverse_rows.size, self.reverse_size, self.rng)
+            rows = np.broadcast_to(reverse_rows[:, np.newaxis], valid.shape)
+            targets = starts[:, np.newaxis] + offsets
+            sources = (starts + sizes - 1)[:, np.newaxis] - offsets
+            genomes[rows[valid], targets[valid]] = genomes[rows[valid], sources[valid]]
+
+        # check if any mutation caused gene to become NaN
+        genomes[np.isnan(genomes)] = 0
+        return genomes
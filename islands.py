@@ -0,0 +1,179 @@
+import numpy as np
+from multiprocessing import Pool
+import agents
+import genetic
+import NeuralNetwork
+from engine import Engine
+from config import ExperimentConfig
+from population import Population
+from parallel import run_until_dead
+from streams import RandomStreams
+
+
+def evaluate_genomes(genomes, settings, rng):
+    """
+    Runs one generation of bugs headless until every bug is dead
+    :[BugGenome] genomes: Genome of every bug in the generation
+    :dict settings: Bug settings (architecture, max_speed, max_energy, max_rotate, bounds, eyesight)
+    :np.random.Generator rng: Stream of starting positions and angles
+    :return: List of fitness of every bug
+    """
+    num_bugs = len(genomes)
+    population = Population(num_bugs, max_speed=settings["max_speed"], max_energy=settings["max_energy"],
+                            max_rotate=settings["max_rotate"], bounds=settings["bounds"],
+                            eyesight=settings["eyesight"],
+                            movement_cost=agents.Bug.movement_cost, rotation_cost=agents.Bug.rotation_cost,
+                            wall_collide_cost=agents.Bug.wall_collide_cost)
+    positions = Engine.initialise_positions(num_bugs, 80, 920, 80, 920, rng)
+    population.positions[:] = [position.get_coords() for position in positions]
+    # same starting angles as Bug, which uses nn_seed % 36
+    population.angles[:] = rng.integers(0, 1000000, num_bugs) % 36
+    brain_start = genomes[0].get_segment_bounds()[1][0]
+    brains = NeuralNetwork.BatchedBugNN.from_brain_genomes(
+        [genome.get_gene_segment(brain_start, len(genome)) for genome in genomes], settings["architecture"])
+    run_until_dead(population, brains)
+    return population.fitness_list()
+
+
+class Island:
+    """One population of an island model, evolved independently between migrations"""
+    def __init__(self, index, genomes, genetic_settings, seed):
+        """
+        :int index: Position of island in the topology
+        :[BugGenome] genomes: Genomes of the next generation to evaluate
+        :dict genetic_settings: Keyword arguments of this island's BatchGeneticController
+        :np.random.SeedSequence seed: Seed of this island's random streams, spawned from the model's seed
+        """
+        self.index = index
+        self.genomes = genomes
+        self.genetic_settings = genetic_settings
+        self.seed = seed
+        self.streams = RandomStreams(seed)
+        self.generation = 0
+        # best (genome, fitness) of the last evaluated generation, sent to other islands on migration
+        self.best = []
+
+
+def evolve_island(task):
+    """
+    Worker entry point, evolves an island for a number of generations
+    :(Island, int, [BugGenome], int, dict) task: Island, number of generations, immigrants to take in,
+                                                 number of best genomes to keep for emigration, bug settings
+    :return: Evolved island and list of [generation, fitness list] of each generation
+    """
+    island, num_generations, immigrants, migration_size, settings = task
+    num_bugs = len(island.genomes)
+    if immigrants:
+        # children at the end of the list were bred from the weakest parents
+        island.genomes[num_bugs - len(immigrants):] = immigrants
+
+    generation_fitness = []
+    for _ in range(num_generations):
+        # streams are keyed by generation, so results do not depend on which worker runs the island
+        fitness_list = evaluate_genomes(island.genomes, settings, island.streams.positions(island.generation))
+        genetic_controller = genetic.BatchGeneticController(np.stack([genome.genome for genome in island.genomes]),
+                                                            fitness_list, **island.genetic_settings,
+                                                            rng=island.streams.ga(island.generation))
+        # genomes of the controller are sorted by fitness, best first
+        island.best = [(genetic.BugGenome.from_buffer(row, settings["architecture"]), fitness)
+                       for row, fitness in zip(genetic_controller.genomes[:migration_size],
+                                               genetic_controller.fitness[:migration_size].tolist())]
+        children = genetic_controller.generate_children(verbose=False)[:num_bugs]
+        island.genomes = [genetic.BugGenome.from_buffer(row, settings["architecture"]) for row in children]
+        generation_fitness.append([island.generation, fitness_list])
+        island.generation += 1
+    return island, generation_fitness
+
+
+class IslandModel:
+    """
+    Evolves several populations in parallel processes, exchanging their best genomes
+    every migration_interval generations over a ring or fully connected topology.
+    """
+    topologies = ("ring", "full")
+
+    @staticmethod
+    def random_genomes(num_genomes, architecture, bug_streams):
+        """
+        :int num_genomes: Number of genomes to create
+        :[dict] architecture: Architecture of BugNN
+        :[np.random.Generator] bug_streams: Stream of each genome
+        :return: List of BugGenome with random colours and brains
+        """
+        genomes = []
+        for bug_stream in bug_streams[:num_genomes]:
+            colours = (bug_stream.integers(80, 210, 9, endpoint=True) / 255.0).tolist()
+            brain = NeuralNetwork.BugNN(architecture=architecture, rng=bug_stream)
+            weights, biases = brain.get_brain_genome()
+            genomes.append(genetic.BugGenome(colours, weights, biases))
+        return genomes
+
+    def __init__(self, genetic_settings, population_size, migration_interval, migration_size,
+                 topology="ring", settings=None, seed=0, stats_name="island"):
+        """
+        :[dict] genetic_settings: BatchGeneticController keyword arguments of each island, one island per dict
+        :int population_size: Number of bugs on each island
+        :int migration_interval: Number of generations between migrations
+        :int migration_size: Number of best genomes each island sends per migration, an island must take in
+                             fewer immigrants than population_size
+        :str topology: "ring" (island i sends to island i+1) or "full" (every island sends to every other island)
+        :dict settings: Bug settings, defaults to the ones of ExperimentConfig
+        :int seed: Seed of the islands' random streams
+        :str stats_name: Prefix of per-island stats csv files
+        """
+        if topology not in IslandModel.topologies:
+            raise Exception(f"Unknown topology {topology}, choose from {IslandModel.topologies}.")
+        num_immigrants = migration_size if topology == "ring" else migration_size * (len(genetic_settings) - 1)
+        if num_immigrants >= population_size:
+            raise Exception(f"Islands would take in {num_immigrants} immigrants per migration, "
+                            f"which must be fewer than the population size {population_size}.")
+        self.settings = settings if settings is not None else ExperimentConfig().bug_settings()
+        self.migration_interval = migration_interval
+        self.migration_size = migration_size
+        self.topology = topology
+        self.stats_name = stats_name
+        self.islands = []
+        # independent streams of every island, no island shares a stream with another island or seed
+        island_seeds = np.random.SeedSequence(seed).spawn(len(genetic_settings))
+        for index, (island_settings, island_seed) in enumerate(zip(genetic_settings, island_seeds)):
+            genomes = IslandModel.random_genomes(population_size, self.settings["architecture"],
+                                                 RandomStreams(island_seed).bugs(0, population_size))
+            self.islands.append(Island(index, genomes, island_settings, seed=island_seed))
+
+    def get_immigrants(self):
+        """
+        :return: List of immigrant genomes for each island, according to the topology
+        """
+        num_islands = len(self.islands)
+        emigrants = [[genome for genome, _ in island.best] for island in self.islands]
+        if self.topology == "ring":
+            return [emigrants[(index - 1) % num_islands] for index in range(num_islands)]
+        return [[genome for other in range(num_islands) if other != index for genome in emigrants[other]]
+                for index in range(num_islands)]
+
+    def run(self, num_migrations):
+        """
+        Runs num_migrations rounds of migration_interval generations on every island
+        :int num_migrations: Number of rounds to run
+        """
+        immigrants = [[] for _ in self.islands]
+        with Pool(len(self.islands)) as pool:
+            for _ in range(num_migrations):
+                results = pool.map(evolve_island, [(island, self.migration_interval, island_immigrants,
+                                                    self.migration_size, self.settings)
+                                                   for island, island_immigrants in zip(self.islands, immigrants)])
+                self.islands = [island for island, _ in results]
+                for island, generation_fitness in results:
+                    for generation, fitness_list in generation_fitness:
+                        Engine.write_stats(f"{self.stats_name}_{island.index}_bug_stats.csv",
+                                           generation, fitness_list)
+                    print(f"Island {island.index} best fitness of generation {island.generation - 1}: "
+                          f"{max(generation_fitness[-1][1])}")
+                immigrants = self.get_immigrants()
+
+
+if __name__ == "__main__":
+    island_model = IslandModel([{**ExperimentConfig().genetic_settings(), "noise_rate": noise_rate}
+                                for noise_rate in (0.005, 0.009, 0.015, 0.025)],
+                               population_size=400, migration_interval=10, migration_size=5, topology="ring")
+    island_model.run(100)
@@ -1,5 +1,6 @@
 import pygame
 from abc import ABC, abstractmethod
+from utility import LRUCache
 
 class Object(ABC):
     def __init__(self, width, height, left, top, colour, speed, bounds, to_draw=True, alpha=255):
@@ -38,6 +39,9 @@ class Object(ABC):
     def get_loc(self):
         return self.pygame_box.left, self.pygame_box.top
 
+    def get_centre(self):
+        return self.pygame_box.center
+
     def set_loc(self, x, y):
         self.pygame_box.update(x, y, *self.get_size())
 
@@ -99,15 +103,20 @@ class Rect(Object):
 
 
 class Food(Object):
+    # surfaces shared by every food with the same size, colour and alpha
+    surface_cache = LRUCache(256)
+
     def __init__(self, amount, width, height, left, top, colour, to_draw=True, alpha=255):
         super().__init__(width, height, left, top, colour, [0, 0], (0, 0, 0, 0), to_draw, alpha)
         self.amount = amount
 
     def draw(self) -> pygame.Surface:
-        rect_surface = pygame.Surface(super().get_size())
-        rect_surface.fill(super().get_colour())
-        rect_surface.set_alpha(self.alpha)
-        return rect_surface
+        def render():
+            rect_surface = pygame.Surface(super(Food, self).get_size())
+            rect_surface.fill(super(Food, self).get_colour())
+            rect_surface.set_alpha(self.alpha)
+            return rect_surface
+        return Food.surface_cache.get((self.get_size(), tuple(self.get_colour()), self.alpha), render)
 
     def exists(self):
         return self.amount > 0
@@ -0,0 +1,72 @@
+import numpy as np
+from multiprocessing import Pool
+
+
+def run_until_dead(population, brains, max_ticks=None, min_alive_fraction=None):
+    """
+    Steps a population headless until every bug is dead, or a termination policy ends the generation early
+    :Population population: Population to simulate, modified in place
+    :BatchedBugNN brains: Brains of the bugs in population, row for row
+    :int max_ticks: See Population.generation_over
+    :float min_alive_fraction: See Population.generation_over
+    :return: Number of ticks simulated
+    """
+    ticks = 0
+    while not population.generation_over(ticks, max_ticks, min_alive_fraction):
+        alive_indices = population.alive_indices()
+        nn_outputs = brains.forward(population.get_nn_inputs(alive_indices), alive_indices)
+        population.apply_actions(nn_outputs, alive_indices)
+        ticks += 1
+    return ticks
+
+
+def evaluate_shard(shard):
+    """
+    Worker entry point, simulates one shard of a generation
+    :(Population, BatchedBugNN, int) shard: Population and brains of the shard, and its max_ticks
+    :return: Fitness array of the shard
+    """
+    population, brains, max_ticks = shard
+    run_until_dead(population, brains, max_ticks)
+    return population.fitness
+
+
+class ParallelEvaluator:
+    """
+    Evaluates generations on a pool of worker processes.
+    Without vision or food bugs do not interact, so the population is split into one shard per worker
+    and each shard is run to completion.
+    """
+    def __init__(self, num_workers, max_ticks=None):
+        """
+        :int num_workers: Number of worker processes (and shards)
+        :int max_ticks: Ends a generation after this many ticks, no limit if None.
+                        Shards cannot see each other's alive counts, so min_alive_fraction is not supported.
+        """
+        self.num_workers = num_workers
+        self.max_ticks = max_ticks
+        self.pool = Pool(num_workers)
+
+    def evaluate(self, population, brains):
+        """
+        Runs a generation until every bug is dead or it ends early,
+        fitness and alive flags are written back into population
+        :Population population: Population of the generation
+        :BatchedBugNN brains: Brains of the bugs in population, row for row
+        :return: Fitness array of the generation
+        """
+        if population.vision is not None or population.food is not None:
+            raise Exception("Bugs of different shards cannot see each other or share food, "
+                            "evaluate populations with vision or food in one process.")
+        shards = [rows for rows in np.array_split(np.arange(len(population)), self.num_workers) if rows.size > 0]
+        fitness_shards = self.pool.map(evaluate_shard,
+                                       [(population.subset(rows), brains.subset(rows),
+                                         self.max_ticks) for rows in shards])
+        for rows, fitness in zip(shards, fitness_shards):
+            population.fitness[rows] = fitness
+        population.alive[:] = False
+        return population.fitness
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
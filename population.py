@@ -0,0 +1,244 @@
+import math
+import numpy as np
+from utility import Point
+from spatial import SpatialGrid
+
+
+class PointView(Point):
+    """Point whose coordinates are stored in one row of a Population position array"""
+    __slots__ = ("_positions", "_index")
+
+    def __init__(self, positions, index):
+        """
+        :np.ndarray positions: (N, 2) array of x, y coordinates
+        :int index: Row of positions that this point refers to
+        """
+        self._positions = positions
+        self._index = index
+
+    @property
+    def x(self):
+        return float(self._positions[self._index, 0])
+
+    @x.setter
+    def x(self, value):
+        self._positions[self._index, 0] = value
+
+    @property
+    def y(self):
+        return float(self._positions[self._index, 1])
+
+    @y.setter
+    def y(self, value):
+        self._positions[self._index, 1] = value
+
+
+class Population:
+    """
+    Structure-of-arrays store for the state of every bug in a generation.
+    Each bug is one row, Bug objects bound to a population are thin views onto their row.
+    """
+    @classmethod
+    def from_bugs(cls, bugs):
+        """
+        Creates a population from existing bugs and binds every bug to its row
+        :[Bug] bugs: Bugs of the generation, assumed to share max_speed, max_energy, max_rotate, bounds and eyesight
+        :return: Population containing the state of all bugs
+        """
+        first = bugs[0]
+        bounds = ((first.x_bound_low, first.x_bound_high), (first.y_bound_low, first.y_bound_high))
+        # Bug._get_action charges the class-level costs, not the per-bug ones
+        bug_class = type(first)
+        population = cls(len(bugs), max_speed=first.max_speed, max_energy=first.max_energy,
+                         max_rotate=first.max_rotate, bounds=bounds, eyesight=first.eyesight,
+                         movement_cost=bug_class.movement_cost, rotation_cost=bug_class.rotation_cost,
+                         wall_collide_cost=bug_class.wall_collide_cost,
+                         food_energy=bug_class.food_energy, eat_cost=bug_class.eat_cost)
+        for index, bug in enumerate(bugs):
+            population.positions[index] = bug.sprite.get_coords()
+            population.angles[index] = bug.sprite.angle
+            population.energy[index] = bug.energy
+            population.fitness[index] = bug.fitness
+            population.alive[index] = not bug.is_dead
+            population.colours[index] = bug.body_colour[:3], bug.leg_colour[:3], bug.horn_colour[:3]
+            bug.bind(population, index)
+        return population
+
+    def __init__(self, num_bugs, max_speed, max_energy, max_rotate, bounds, eyesight,
+                 movement_cost=0.07, rotation_cost=0.5, wall_collide_cost=1.5, food_energy=50, eat_cost=0.2):
+        """
+        :int num_bugs: Number of rows (bugs) in the population
+        :float max_speed: Maximum distance moved by a bug per tick
+        :float max_energy: Starting energy of every bug
+        :float max_rotate: Angle rotated by a bug per turning action
+        :((int, int), (int, int)) bounds: (x_low, x_high), (y_low, y_high) of the field
+        :float eyesight: Distance a bug can see
+        :float movement_cost: Energy cost of moving, divided by the square of the speed output
+        :float rotation_cost: Energy cost of a turning action
+        :float wall_collide_cost: Energy cost of trying to move out of bounds
+        :float food_energy: Energy gained per unit of food eaten
+        :float eat_cost: Energy cost of eating
+        """
+        self.num_bugs = num_bugs
+        self.max_speed = max_speed
+        self.max_energy = max_energy
+        self.max_rotate = max_rotate
+        self.bounds = bounds
+        self.eyesight = eyesight
+        self.movement_cost = movement_cost
+        self.rotation_cost = rotation_cost
+        self.wall_collide_cost = wall_collide_cost
+        self.food_energy = food_energy
+        self.eat_cost = eat_cost
+        self.positions = np.zeros((num_bugs, 2), dtype=np.float64)
+        self.angles = np.zeros(num_bugs, dtype=np.float64)
+        self.energy = np.full(num_bugs, max_energy, dtype=np.float64)
+        self.fitness = np.zeros(num_bugs, dtype=np.int64)
+        self.alive = np.ones(num_bugs, dtype=bool)
+        # body, leg and horn colour of each bug
+        self.colours = np.zeros((num_bugs, 3, 3), dtype=np.uint8)
+        # index of alive bug positions for neighbour queries, see update_grid
+        self.grid = SpatialGrid(bounds, eyesight)
+        # sensors.Vision filling the food and bug inputs, no vision if None
+        self.vision = None
+        # FoodField eaten by bugs after moving and seen by vision, no food if None
+        self.food = None
+
+    def __len__(self):
+        return self.num_bugs
+
+    def subset(self, rows):
+        """
+        :np.ndarray rows: Indices of bugs to copy
+        :return: New, unbound Population containing copies of the given rows
+        """
+        subset = Population(len(rows), max_speed=self.max_speed, max_energy=self.max_energy,
+                            max_rotate=self.max_rotate, bounds=self.bounds, eyesight=self.eyesight,
+                            movement_cost=self.movement_cost, rotation_cost=self.rotation_cost,
+                            wall_collide_cost=self.wall_collide_cost,
+                            food_energy=self.food_energy, eat_cost=self.eat_cost)
+        subset.positions[:] = self.positions[rows]
+        subset.angles[:] = self.angles[rows]
+        subset.energy[:] = self.energy[rows]
+        subset.fitness[:] = self.fitness[rows]
+        subset.alive[:] = self.alive[rows]
+        subset.colours[:] = self.colours[rows]
+        # bugs only see the other bugs of their subset, and eat from their own copy of the food
+        subset.vision, subset.food = self.vision, self.food
+        return subset
+
+    def alive_indices(self):
+        return np.flatnonzero(self.alive)
+
+    def num_alive(self):
+        return int(np.count_nonzero(self.alive))
+
+    def num_dead(self):
+        return self.num_bugs - self.num_alive()
+
+    def generation_over(self, ticks, max_ticks=None, min_alive_fraction=None):
+        """
+        Whether the generation ends, when every bug is dead or a termination policy ends it early
+        :int ticks: Number of ticks simulated in the generation
+        :int max_ticks: Ends the generation after this many ticks, no limit if None
+        :float min_alive_fraction: Ends the generation once fewer than this fraction of bugs are alive,
+                                   no limit if None. Fitness is the number of ticks survived, so the survivors
+                                   all tie for the best fitness at the cutoff.
+        """
+        num_alive = self.num_alive()
+        if num_alive == 0:
+            return True
+        if max_ticks is not None and ticks >= max_ticks:
+            return True
+        return min_alive_fraction is not None and num_alive < min_alive_fraction * self.num_bugs
+
+    def update_grid(self):
+        """Re-indexes positions of alive bugs, call once per tick before querying neighbours"""
+        alive = self.alive_indices()
+        self.grid.rebuild(self.positions[alive], alive)
+
+    def neighbours(self, rows, radius=None):
+        """
+        Finds other alive bugs near each of the given bugs, as of the last update_grid
+        :np.ndarray rows: Indices of bugs to search around
+        :float radius: Search radius, eyesight if None
+        :return: (rows, neighbour rows, distances) of every pair of bugs within radius, a bug is not its own neighbour
+        """
+        radius = self.eyesight if radius is None else radius
+        query_indices, neighbour_rows, distances = self.grid.query_many(self.positions[rows], radius)
+        query_rows = rows[query_indices]
+        not_self = query_rows != neighbour_rows
+        return query_rows[not_self], neighbour_rows[not_self], distances[not_self]
+
+    def get_nn_inputs(self, rows=None, num_inputs=6):
+        """
+        Builds BugNN inputs of many bugs at once, matches Bug.get_nn_input unless vision is set
+        :np.ndarray rows: Indices of bugs to build inputs for, all bugs if None
+        :int num_inputs: Number of inputs of the first BugNN layer
+        :return: (M, num_inputs) array of inputs
+        """
+        rows = np.arange(self.num_bugs) if rows is None else rows
+        (x_low, x_high), (y_low, y_high) = self.bounds
+        x, y = self.positions[rows, 0], self.positions[rows, 1]
+        nn_inputs = np.zeros((len(rows), num_inputs), dtype=np.float64)
+        # set energy input
+        nn_inputs[:, 0] = self.energy[rows] / self.max_energy
+        # set obstacle input
+        distance_to_bounds = np.minimum(np.minimum(x - x_low, x_high - x),
+                                        np.minimum(y - y_low, y_high - y))
+        nn_inputs[:, 4] = np.maximum(0, 1 - distance_to_bounds / self.eyesight)
+        if self.vision is not None:
+            self.vision.sense(self, rows, nn_inputs, None if self.food is None else self.food.grid)
+        return nn_inputs
+
+    def apply_actions(self, nn_outputs, rows):
+        """
+        Vectorised Bug.update and Bug._get_action for many bugs at once: rotation, translation,
+        bounds test, energy costs, eating (if food is set) and death marking.
+        :np.ndarray nn_outputs: (M, outputs) array of BugNN outputs
+        :np.ndarray rows: Indices of the M bugs that nn_outputs belong to
+        :return: Indices of bugs that died this tick
+        """
+        # bugs with no energy left die without acting
+        no_energy = self.energy[rows] <= 0
+        self.alive[rows[no_energy]] = False
+        rows, nn_outputs = rows[~no_energy], nn_outputs[~no_energy]
+        self.fitness[rows] += 1
+
+        # rotation, action 0 turns left and action 1 turns right
+        action = np.argmax(nn_outputs[:, :3], axis=1)
+        angles = self.angles[rows]
+        energy = self.energy[rows]
+        turning = action < 2
+        turn = np.where(action == 0, self.max_rotate, -self.max_rotate)
+        angles = np.where(turning, (angles + turn) % (math.pi * 2), angles)
+        energy -= np.where(turning, self.rotation_cost, 0)
+
+        # move in straight line
+        speed_output = nn_outputs[:, 3]
+        speed = self.max_speed * speed_output
+        positions = self.positions[rows]
+        destinations = np.empty_like(positions)
+        destinations[:, 0] = positions[:, 0] + -np.sin(angles) * speed
+        destinations[:, 1] = positions[:, 1] + -np.cos(angles) * speed
+        (x_low, x_high), (y_low, y_high) = self.bounds
+        in_bounds = (x_low < destinations[:, 0]) & (destinations[:, 0] < x_high) \
+            & (y_low < destinations[:, 1]) & (destinations[:, 1] < y_high)
+        positions[in_bounds] = destinations[in_bounds]
+        # a speed output of 0 costs infinite energy, as it does in Bug._get_action
+        with np.errstate(divide='ignore'):
+            energy -= np.where(in_bounds, self.movement_cost / (speed_output ** 2), self.wall_collide_cost)
+
+        self.angles[rows] = angles
+        self.positions[rows] = positions
+        self.energy[rows] = energy
+        if self.food is not None:
+            # bugs still standing eat what they reached
+            self.food.update(self, rows[energy > 0])
+            energy = self.energy[rows]
+        died = rows[energy <= 0]
+        self.alive[died] = False
+        return died
+
+    def fitness_list(self):
+        return self.fitness.tolist()
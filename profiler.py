@@ -0,0 +1,104 @@
+import json
+import time
+import numpy as np
+
+
+class PhaseTimer:
+    """Durations of the last window calls of one phase"""
+    def __init__(self, window):
+        """
+        :int window: Number of most recent durations kept for rolling stats
+        """
+        self.durations = np.zeros(window, dtype=np.float64)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds):
+        self.durations[self.count % len(self.durations)] = seconds
+        self.count += 1
+        self.total += seconds
+
+    def stats(self):
+        """
+        :return: dict of mean, p95 and max of the rolling window in seconds, and count and total of every call
+        """
+        durations = self.durations[:min(self.count, len(self.durations))]
+        if len(durations) == 0:
+            return {"mean": 0.0, "p95": 0.0, "max": 0.0, "count": 0, "total": 0.0}
+        return {"mean": float(durations.mean()), "p95": float(np.percentile(durations, 95)),
+                "max": float(durations.max()), "count": self.count, "total": self.total}
+
+
+class Profiler:
+    """
+    Per-phase timing counters of Engine. Phases are timed with start and stop:
+
+        timer = profiler.start()
+        ...
+        profiler.stop("phase", timer)
+
+    Every phase keeps rolling stats over its last window calls, and the total time of every phase is also
+    recorded per generation. A disabled profiler only costs the two calls.
+    """
+    def __init__(self, window=600, filepath=None, enabled=True):
+        """
+        :int window: Number of most recent calls of each phase kept for rolling stats
+        :str filepath: JSON file stats are dumped to at the end of every generation, not dumped if None
+        :bool enabled: Whether phases are timed at all
+        """
+        self.window = window
+        self.filepath = filepath
+        self.enabled = enabled
+        self.phases = {}
+        # total seconds spent in each phase during the current generation, and during every finished generation
+        self.generation_totals = {}
+        self.generations = []
+
+    def start(self):
+        """
+        :return: Start time to pass to stop, None if disabled
+        """
+        if not self.enabled:
+            return None
+        return time.perf_counter()
+
+    def stop(self, phase, start):
+        """
+        Records the time since start as one call of phase
+        :str phase: Name of phase
+        :float start: Start time returned by start
+        """
+        if start is None:
+            return
+        seconds = time.perf_counter() - start
+        timer = self.phases.get(phase)
+        if timer is None:
+            timer = self.phases[phase] = PhaseTimer(self.window)
+        timer.add(seconds)
+        self.generation_totals[phase] = self.generation_totals.get(phase, 0.0) + seconds
+
+    def end_generation(self, generation):
+        """
+        Records the per-phase totals of a finished generation and dumps stats if filepath is set
+        :int generation: Generation number
+        """
+        if not self.enabled:
+            return
+        self.generations.append({"generation": generation, **self.generation_totals})
+        self.generation_totals = {}
+        if self.filepath is not None:
+            self.dump(self.filepath)
+
+    def stats(self):
+        """
+        :return: dict of rolling stats of every phase, see PhaseTimer.stats
+        """
+        return {phase: timer.stats() for phase, timer in self.phases.items()}
+
+    def dump(self, filepath):
+        """
+        Writes rolling stats of every phase and per-generation totals to a JSON file
+        :str filepath: Path of JSON file
+        """
+        with open(filepath, 'w') as file:
+            json.dump({"window": self.window, "phases": self.stats(), "generations": self.generations}, file, indent=2)
@@ -0,0 +1,110 @@
+import threading
+import numpy as np
+import pygame
+
+
+class Renderer:
+    """
+    Draws a frame onto the canvas with a single Surface.blits call and only pushes changed areas to the display.
+    Things that stop moving (dead bugs) are stamped onto a static background layer once instead of every frame.
+    """
+    def __init__(self, canvas, background_colour):
+        """
+        :pygame.Surface canvas: Display surface
+        :(int, int, int) background_colour: Colour of canvas background
+        """
+        self.canvas = canvas
+        self.background_colour = background_colour
+        self.background = pygame.Surface(canvas.get_size()).convert()
+        # areas drawn over last frame, restored from the background next frame
+        self.previous_rects = []
+        # areas of the background changed since last frame
+        self.stamped_rects = []
+        self.full_update = True
+        self.reset()
+
+    def reset(self):
+        """Clears the background layer, the next frame redraws the whole display"""
+        self.background.fill(self.background_colour)
+        self.previous_rects = []
+        self.stamped_rects = []
+        self.full_update = True
+
+    def stamp(self, surface, location):
+        """
+        Draws surface permanently onto the background layer
+        :pygame.Surface surface: Surface to draw
+        :(float, float) location: Top left corner of surface
+        """
+        self.stamped_rects.append(self.background.blit(surface, location))
+
+    def render(self, blit_sequence):
+        """
+        Draws one frame
+        :[(pygame.Surface, (float, float))] blit_sequence: Surfaces and top left corners to draw over the background
+        """
+        if self.full_update:
+            self.canvas.blit(self.background, (0, 0))
+        else:
+            # erase last frame and show newly stamped surfaces
+            restore_rects = self.previous_rects + self.stamped_rects
+            self.canvas.blits([(self.background, rect, rect) for rect in restore_rects], doreturn=False)
+        drawn_rects = self.canvas.blits(blit_sequence)
+
+        if self.full_update:
+            pygame.display.flip()
+            self.full_update = False
+        else:
+            pygame.display.update(self.previous_rects + self.stamped_rects + drawn_rects)
+        self.previous_rects = drawn_rects
+        self.stamped_rects = []
+
+
+class Snapshot:
+    """Copy of the state needed to draw one frame"""
+    def __init__(self):
+        self.positions = np.zeros((0, 2))
+        self.angles = np.zeros(0)
+        self.alive = np.zeros(0, dtype=bool)
+        self.agents = None
+        self.ui_dict = None
+        self.food_blits = []
+
+    def copy_from(self, population, agents, ui_dict, food_field=None):
+        if self.positions.shape != population.positions.shape:
+            self.positions = np.empty_like(population.positions)
+            self.angles = np.empty_like(population.angles)
+            self.alive = np.empty_like(population.alive)
+        np.copyto(self.positions, population.positions)
+        np.copyto(self.angles, population.angles)
+        np.copyto(self.alive, population.alive)
+        self.agents = agents
+        self.ui_dict = dict(ui_dict)
+        self.food_blits = [] if food_field is None else food_field.draw()
+
+
+class SnapshotBuffer:
+    """
+    Hands snapshots from the simulation thread to the render thread.
+    Triple buffered: the simulation fills one snapshot, the renderer draws another and the third holds
+    the latest complete snapshot, so neither thread ever waits for the other to finish copying or drawing.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.writing, self.ready, self.reading = Snapshot(), Snapshot(), Snapshot()
+        self.is_fresh = False
+
+    def publish(self, population, agents, ui_dict, food_field=None):
+        """Called by the simulation thread after a step"""
+        self.writing.copy_from(population, agents, ui_dict, food_field)
+        with self.lock:
+            self.writing, self.ready = self.ready, self.writing
+            self.is_fresh = True
+
+    def latest(self):
+        """Called by the render thread, returns the latest published snapshot"""
+        with self.lock:
+            if self.is_fresh:
+                self.reading, self.ready = self.ready, self.reading
+                self.is_fresh = False
+        return self.reading
@@ -0,0 +1,106 @@
+import numpy as np
+
+
+class Vision:
+    """
+    Ray-cast vision of many bugs at once. Every bug casts one ray per fov angle, eyesight long, against the walls,
+    food and other bugs. A reading is the inverse distance to the nearest hit as a proportion of eyesight,
+    1 when touching and 0 when nothing is within eyesight, matching the obstacle input of Bug.get_nn_input.
+    Readings fill the BugNN inputs: food left, food front, food right, obstacle and bug.
+    """
+    # radius of the circle a bug or a food item is hit as
+    bug_radius = 8
+    food_radius = 3
+
+    def __init__(self, fov, eyesight, bug_radius=None, food_radius=None):
+        """
+        :[float] fov: Ray angles relative to the bug's heading in radians, positive to the left, see Bug.fov
+        :float eyesight: Length of each ray
+        :float bug_radius: Radius bugs are hit as
+        :float food_radius: Radius food is hit as
+        """
+        self.fov = np.asarray(fov, dtype=np.float64)
+        self.eyesight = eyesight
+        self.bug_radius = bug_radius if bug_radius is not None else Vision.bug_radius
+        self.food_radius = food_radius if food_radius is not None else Vision.food_radius
+        # rays to the left of the heading, to the right, and in front (the rest)
+        self.left_rays = self.fov == self.fov.max()
+        self.right_rays = self.fov == self.fov.min()
+        self.front_rays = ~(self.left_rays | self.right_rays)
+        if not self.front_rays.any():
+            self.front_rays = np.ones(len(self.fov), dtype=bool)
+
+    def ray_directions(self, angles):
+        """
+        :np.ndarray angles: (M,) headings of bugs
+        :return: (M, rays, 2) unit vectors of every ray, heading 0 points up like BugSprite.pointing_vector
+        """
+        ray_angles = angles[:, None] + self.fov[None, :]
+        return np.stack((-np.sin(ray_angles), -np.cos(ray_angles)), axis=2)
+
+    def wall_readings(self, positions, directions, bounds):
+        """
+        :np.ndarray positions: (M, 2) ray origins
+        :np.ndarray directions: (M, rays, 2) ray directions
+        :((int, int), (int, int)) bounds: (x_low, x_high), (y_low, y_high) of the field
+        :return: (M, rays) readings of the nearest wall along each ray
+        """
+        (x_low, x_high), (y_low, y_high) = bounds
+        x, y = positions[:, 0, None], positions[:, 1, None]
+        direction_x, direction_y = directions[:, :, 0], directions[:, :, 1]
+        with np.errstate(divide='ignore'):
+            # distance along the ray to the wall it is heading towards on each axis, inf if parallel
+            distance_x = np.where(direction_x < 0, (x - x_low) / -direction_x, (x_high - x) / direction_x)
+            distance_y = np.where(direction_y < 0, (y - y_low) / -direction_y, (y_high - y) / direction_y)
+        return np.maximum(0, 1 - np.minimum(distance_x, distance_y) / self.eyesight)
+
+    def target_readings(self, positions, directions, grid, radius, rows=None):
+        """
+        :np.ndarray positions: (M, 2) ray origins
+        :np.ndarray directions: (M, rays, 2) ray directions
+        :SpatialGrid grid: Index of targets, each hit as a circle
+        :float radius: Radius of targets
+        :np.ndarray rows: (M,) grid rows of the ray origins themselves, so bugs do not see themselves
+        :return: (M, rays) readings of the nearest target along each ray
+        """
+        readings = np.zeros(directions.shape[:2], dtype=np.float64)
+        query_indices, target_rows, offsets = grid.query_offsets(positions, self.eyesight + radius)
+        if rows is not None:
+            not_self = rows[query_indices] != target_rows
+            query_indices, offsets = query_indices[not_self], offsets[not_self]
+        if len(query_indices) == 0:
+            return readings
+
+        # distance along each ray to the closest approach to the target's centre, and how close that is
+        along = np.einsum('pk,prk->pr', offsets, directions[query_indices])
+        distance_squared = (offsets[:, 0] ** 2 + offsets[:, 1] ** 2)[:, None]
+        miss_squared = distance_squared - along ** 2
+        hit = (miss_squared <= radius ** 2) & ((along > 0) | (distance_squared <= radius ** 2))
+        hit_distance = np.maximum(along - np.sqrt(np.maximum(radius ** 2 - miss_squared, 0)), 0)
+        target_readings = np.where(hit, np.maximum(0, 1 - hit_distance / self.eyesight), 0)
+        np.maximum.at(readings, query_indices, target_readings)
+        return readings
+
+    def sense(self, population, rows, nn_inputs, food_grid=None):
+        """
+        Casts rays of the given bugs and writes readings into their BugNN inputs
+        :Population population: Population the bugs belong to, its grid is rebuilt
+        :np.ndarray rows: Indices of the M bugs to sense for
+        :np.ndarray nn_inputs: (M, inputs) BugNN inputs to write into, slots 1-3 food, 4 obstacle and 5 bug
+        :SpatialGrid food_grid: Index of food to see, no food is seen if None
+        """
+        positions = population.positions[rows]
+        directions = self.ray_directions(population.angles[rows])
+
+        if food_grid is not None and len(food_grid):
+            food = self.target_readings(positions, directions, food_grid, self.food_radius)
+            nn_inputs[:, 1] = food[:, self.left_rays].max(axis=1)
+            nn_inputs[:, 2] = food[:, self.front_rays].max(axis=1)
+            nn_inputs[:, 3] = food[:, self.right_rays].max(axis=1)
+
+        # walls are only seen along the rays, instead of the closest wall in any direction
+        nn_inputs[:, 4] = self.wall_readings(positions, directions, population.bounds).max(axis=1)
+
+        population.update_grid()
+        bugs = self.target_readings(positions, directions, population.grid, self.bug_radius, rows=rows)
+        nn_inputs[:, 5] = bugs.max(axis=1)
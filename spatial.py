@@ -0,0 +1,119 @@
+import math
+import numpy as np
+
+
+class SpatialGrid:
+    """
+    Uniform grid index over points in a bounded field, e.g. bug positions or food centres.
+    Points are bucketed by cell and stored sorted by cell id, so the points of a run of cells in one grid row
+    are one contiguous slice. A query within radius only looks at the cells the radius touches, O(k) instead of O(N).
+    Rebuilding is a single sort, cheap enough to do every tick.
+    """
+    @classmethod
+    def from_objects(cls, objects, bounds, cell_size):
+        """
+        :[objects.Object] objects: Objects to index by the centre of their rect, e.g. Food
+        :((int, int), (int, int)) bounds: (x_low, x_high), (y_low, y_high) of the field
+        :float cell_size: Edge length of a cell
+        :return: SpatialGrid whose query rows are indices into objects
+        """
+        grid = cls(bounds, cell_size)
+        grid.rebuild(np.array([game_object.get_centre() for game_object in objects], dtype=np.float64).reshape(-1, 2))
+        return grid
+
+    def __init__(self, bounds, cell_size):
+        """
+        :((int, int), (int, int)) bounds: (x_low, x_high), (y_low, y_high) of the field, points outside are clamped
+                                          to the edge cells
+        :float cell_size: Edge length of a cell, usually the largest query radius (e.g. eyesight)
+        """
+        if cell_size <= 0:
+            raise Exception("Cell size of SpatialGrid must be positive.")
+        (self.x_low, x_high), (self.y_low, y_high) = bounds
+        self.cell_size = cell_size
+        self.num_cells_x = max(1, math.ceil((x_high - self.x_low) / cell_size))
+        self.num_cells_y = max(1, math.ceil((y_high - self.y_low) / cell_size))
+        self.num_cells = self.num_cells_x * self.num_cells_y
+        self.positions = np.zeros((0, 2), dtype=np.float64)
+        self.rows = np.zeros(0, dtype=np.int64)
+        # indices into positions sorted by cell, and where each cell starts in that order
+        self.order = np.zeros(0, dtype=np.int64)
+        self.cell_starts = np.zeros(self.num_cells + 1, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def cell_coords(self, positions):
+        """
+        :np.ndarray positions: (N, 2) array of x, y coordinates
+        :return: Column and row of the cell containing each position
+        """
+        cell_x = ((positions[:, 0] - self.x_low) // self.cell_size).astype(np.int64)
+        cell_y = ((positions[:, 1] - self.y_low) // self.cell_size).astype(np.int64)
+        return np.clip(cell_x, 0, self.num_cells_x - 1), np.clip(cell_y, 0, self.num_cells_y - 1)
+
+    def rebuild(self, positions, rows=None):
+        """
+        Replaces the indexed points
+        :np.ndarray positions: (N, 2) array of x, y coordinates, kept by reference until the next rebuild
+        :np.ndarray rows: Identifier of each point returned by queries, e.g. population rows, 0..N-1 if None
+        """
+        self.positions = positions
+        self.rows = np.arange(len(positions)) if rows is None else np.asarray(rows)
+        cell_x, cell_y = self.cell_coords(positions)
+        cells = cell_y * self.num_cells_x + cell_x
+        self.order = np.argsort(cells, kind='stable')
+        self.cell_starts[0] = 0
+        np.cumsum(np.bincount(cells, minlength=self.num_cells), out=self.cell_starts[1:])
+
+    def query(self, x, y, radius):
+        """
+        Finds every point within radius of one location
+        :float x: x coordinate of location
+        :float y: y coordinate of location
+        :float radius: Search radius
+        :return: Rows of points within radius and their distances from the location
+        """
+        query_rows, rows, distances = self.query_many(np.array([[x, y]], dtype=np.float64), radius)
+        return rows, distances
+
+    def query_many(self, query_positions, radius):
+        """
+        Finds every point within radius of each of many locations at once
+        :np.ndarray query_positions: (M, 2) array of x, y coordinates to search around
+        :float radius: Search radius
+        :return: (query indices, rows, distances) of every pair of location and point within radius of each other,
+                 query indices index query_positions and rows are the identifiers given to rebuild
+        """
+        query_indices, rows, offsets = self.query_offsets(query_positions, radius)
+        return query_indices, rows, np.hypot(offsets[:, 0], offsets[:, 1])
+
+    def query_offsets(self, query_positions, radius):
+        """
+        Same as query_many, but returns offsets instead of distances
+        :np.ndarray query_positions: (M, 2) array of x, y coordinates to search around
+        :float radius: Search radius
+        :return: (query indices, rows, offsets) where offsets is a (P, 2) array of point position - query position
+        """
+        reach = math.ceil(radius / self.cell_size)
+        query_x, query_y = self.cell_coords(query_positions)
+        # points in cells query_x - reach .. query_x + reach of one grid row are contiguous in self.order
+        first_x = np.clip(query_x - reach, 0, self.num_cells_x - 1)
+        last_x = np.clip(query_x + reach, 0, self.num_cells_x - 1)
+        query_indices, slots = [], []
+        for offset_y in range(-reach, reach + 1):
+            cell_y = query_y + offset_y
+            in_grid = (cell_y >= 0) & (cell_y < self.num_cells_y)
+            cell_y = np.clip(cell_y, 0, self.num_cells_y - 1)
+            starts = self.cell_starts[cell_y * self.num_cells_x + first_x]
+            counts = np.where(in_grid, self.cell_starts[cell_y * self.num_cells_x + last_x + 1] - starts, 0)
+            # expand each (start, count) slice into the slots it covers
+            repeated_starts = np.repeat(starts - (np.cumsum(counts) - counts), counts)
+            query_indices.append(np.repeat(np.arange(len(query_positions)), counts))
+            slots.append(repeated_starts + np.arange(counts.sum()))
+        query_indices = np.concatenate(query_indices)
+        points = self.order[np.concatenate(slots)]
+
+        offsets = self.positions[points] - query_positions[query_indices]
+        within = offsets[:, 0] ** 2 + offsets[:, 1] ** 2 <= radius ** 2
+        return query_indices[within], self.rows[points[within]], offsets[within]
@@ -1,6 +1,6 @@
 import math
 import pygame
-from utility import Vector, Point, Line
+from utility import Vector, Point, Line, LRUCache
 
 
 class Polygon:
@@ -53,8 +53,11 @@ class Polygon:
         return Polygon(*rotated_points)
 
     def rotate_about_ip(self, angle, origin):
+        # every point shares one sin/cos
+        cos_angle, sin_angle = math.cos(angle), math.sin(angle)
+        origin_x, origin_y = origin.get_coords()
         for p in self.points:
-            p.rotate_about_ip(angle, origin)
+            p.rotate_about_cs_ip(cos_angle, sin_angle, origin_x, origin_y)
         self.midpoint = self.get_midpoint()
 
     def set_surface_size(self, edge_length):
@@ -93,80 +96,139 @@ class Quad(Polygon):
         return furtherest_pair, longest_distance
 
 
+class RotationAtlas:
+    """
+    Surface rendered at evenly spaced angles, so drawing it rotated is a table lookup instead of a rotation.
+    Each angle is rendered the first time it is drawn, so bugs with new colours only pay for the angles they face.
+    Atlases are shared between sprites that look the same, the least recently used ones are evicted
+    once their worst case memory exceeds max_bytes.
+    """
+    max_bytes = 64 * 2 ** 20
+    atlases = LRUCache(max_bytes, weigh=lambda atlas: atlas.max_bytes)
+
+    @classmethod
+    def get(cls, key, surface, steps):
+        """
+        :key: Hashable description of how surface looks, e.g. its colours
+        :pygame.Surface surface: Unrotated surface
+        :int steps: Number of angles to pre-render
+        :return: Shared RotationAtlas of surface
+        """
+        return cls.atlases.get((key, steps), lambda: cls(surface, steps))
+
+    def __init__(self, surface, steps):
+        self.surface = surface
+        self.steps = steps
+        self.step_angle = 2 * math.pi / steps
+        self.surfaces, self.offsets = [None] * steps, [None] * steps
+        # memory of every angle rendered, a rotated surface is at most its diagonal wide and high
+        width, height = surface.get_size()
+        diagonal = math.ceil(math.hypot(width, height))
+        self.max_bytes = steps * diagonal * diagonal * surface.get_bytesize()
+
+    def lookup(self, angle):
+        """
+        :float angle: Angle in radians, rounded to the nearest step
+        :return: Rotated surface and offset of its top left corner from its midpoint
+        """
+        index = round(angle / self.step_angle) % self.steps
+        if self.surfaces[index] is None:
+            rotated_surface = pygame.transform.rotate(self.surface, math.degrees(index * self.step_angle))
+            self.surfaces[index] = rotated_surface
+            # offset of top left corner from the midpoint of the rotated surface
+            centre_x, centre_y = rotated_surface.get_rect().center
+            self.offsets[index] = (-centre_x, -centre_y)
+        return self.surfaces[index], self.offsets[index]
+
+
 class BugSprite(Polygon):
+    # number of angles in the rotation atlas, None to rotate the surface on every draw
+    rotation_steps = 64
+    # unrotated surfaces shared by every sprite with the same (body, leg, horn) colours
+    surface_cache = LRUCache(4096)
+
+    @staticmethod
+    def render_surface(body_colour, leg_colour, horn_colour):
+        """Draws unrotated bug with the given colours, centred on a new surface"""
+        surface = pygame.Surface((16, 28), pygame.SRCALPHA)
+        midpoint = Point(*surface.get_rect().center)
+        body_points = [midpoint.translate_by(Vector(4*(-1)**i, -10)) for i in range(1, 3)]
+        body_points.extend([midpoint.translate_by(Vector(4*(-1)**i, 10)) for i in range(2)])
+        x_min, y_min = body_points[0].get_coords()
+        legs = [Line(Point(x_min - 4, 4 * i + y_min + 2),
+                     Point(x_min + 12, 4 * i + y_min + 2))
+                for i in range(1, 4)]
+        horns = [Line(Point(x_min + 1, y_min - 8), Point(x_min + 2, y_min)),
+                 Line(Point(x_min + 7, y_min - 8), Point(x_min + 6, y_min))]
+        for leg in legs:
+            pygame.draw.line(surface, leg_colour,
+                             leg.point_1.get_coords(),
+                             leg.point_2.get_coords(),
+                             width=2)
+        for horn in horns:
+            pygame.draw.line(surface, horn_colour,
+                             horn.point_1.get_coords(),
+                             horn.point_2.get_coords(),
+                             width=2)
+        pygame.draw.polygon(surface, body_colour, [p.get_coords() for p in body_points])
+        return surface
+
     def __init__(self, midpoint, angle=0,
                  body_colour=(255, 255, 255),
                  horn_colour=(255, 255, 255),
                  leg_colour=(255, 255, 255)):
-        self.body_points = [midpoint.translate_by(Vector(4*(-1)**i, -10)) for i in range(1, 3)]
-        self.body_points.extend([midpoint.translate_by(Vector(4*(-1)**i, 10)) for i in range(2)])
-        x_min, y_min = self.body_points[0].get_coords()
         self.midpoint = midpoint
         self.angle = angle
         self.body_colour, self.horn_colour, self.leg_colour = body_colour, horn_colour, leg_colour
-        self.body = Quad(*self.body_points, colour=body_colour)
-        self.body.set_surface_size(33)
-        self.legs = [Line(Point(x_min - 4, 4 * i + y_min + 2),
-                          Point(x_min + 12, 4 * i + y_min + 2))
-                     for i in range(1, 4)]
-        self.horns = [Line(Point(x_min + 1, y_min - 8), Point(x_min + 2, y_min)),
-                      Line(Point(x_min + 7, y_min - 8), Point(x_min + 6, y_min))]
         self.original_surface = self.get_initial_surface()
+        self.surface_midpoint = self.get_surface_midpoint(self.original_surface)
+        self.atlas = None
+        # angle the cached pointing direction was computed for
+        self.pointing_angle, self.pointing = None, None
 
     def new_colour(self, body_colour=None, leg_colour=None, horn_colour=None):
         self.body_colour = body_colour if body_colour is not None else self.body_colour
         self.leg_colour = leg_colour if leg_colour is not None else self.leg_colour
         self.horn_colour = horn_colour if horn_colour is not None else self.horn_colour
-
-        # reposition body parts
-        self.body_points = [self.midpoint.translate_by(Vector(4 * (-1) ** i, -10)) for i in range(1, 3)]
-        self.body_points.extend([self.midpoint.translate_by(Vector(4 * (-1) ** i, 10)) for i in range(2)])
-        x_min, y_min = self.body_points[0].get_coords()
-        self.body = Quad(*self.body_points, colour=body_colour)
-        self.body.set_surface_size(33)
-        self.legs = [Line(Point(x_min - 4, 4 * i + y_min + 2),
-                          Point(x_min + 12, 4 * i + y_min + 2))
-                     for i in range(1, 4)]
-        self.horns = [Line(Point(x_min + 1, y_min - 8), Point(x_min + 2, y_min)),
-                      Line(Point(x_min + 7, y_min - 8), Point(x_min + 6, y_min))]
         self.original_surface = self.get_initial_surface()
+        self.atlas = None
 
     def get_initial_surface(self):
-        original_surface = pygame.Surface((16, 28), pygame.SRCALPHA)
-        self.surface_midpoint = self.get_surface_midpoint(original_surface)
-        absolute_to_relative = Vector.vector_from_points(self.midpoint, self.surface_midpoint)
-        relative_legs = [leg.translate_by(absolute_to_relative) for leg in self.legs]
-        for leg in relative_legs:
-            pygame.draw.line(original_surface, self.leg_colour,
-                             leg.point_1.get_coords(),
-                             leg.point_2.get_coords(),
-                             width=2)
-        relative_horns = [horn.translate_by(absolute_to_relative) for horn in self.horns]
-        for horn in relative_horns:
-            pygame.draw.line(original_surface, self.horn_colour,
-                             horn.point_1.get_coords(),
-                             horn.point_2.get_coords(),
-                             width=2)
-        relative_points = [p.translate_by(absolute_to_relative).get_coords()
-                           for p in self.body_points]
-        pygame.draw.polygon(original_surface, self.body_colour, relative_points)
-        return original_surface
+        """Returns shared unrotated surface of sprite, drawn only if no sprite with the same colours is cached"""
+        return BugSprite.surface_cache.get(self.get_colour_key(),
+                                           lambda: BugSprite.render_surface(*self.get_colour_key()))
 
     def get_surface_midpoint(self, surface):
         return Point(*surface.get_rect().center)
 
+    def get_colour_key(self):
+        return tuple(self.body_colour), tuple(self.leg_colour), tuple(self.horn_colour)
+
     def draw(self, width=0):
         """Returns surface containing sprite and location of top left corner of the surface."""
+        return self.draw_at(self.midpoint, self.angle)
+
+    def draw_at(self, midpoint, angle):
+        """
+        Draws sprite with a given pose instead of its own, e.g. from a snapshot of an earlier tick
+        :Point midpoint: Position of midpoint of sprite
+        :float angle: Angle of sprite in radians
+        :return: Surface containing sprite and location of top left corner of the surface
+        """
+        if BugSprite.rotation_steps is not None:
+            if self.atlas is None:
+                self.atlas = RotationAtlas.get(self.get_colour_key(), self.original_surface, BugSprite.rotation_steps)
+            draw_surface, (offset_x, offset_y) = self.atlas.lookup(angle)
+            return draw_surface, Point(midpoint.x + offset_x, midpoint.y + offset_y)
         # create new surface with transformation
-        draw_surface = pygame.transform.rotate(self.original_surface, math.degrees(self.angle))
+        draw_surface = pygame.transform.rotate(self.original_surface, math.degrees(angle))
         # midpoint of new transformed surface
-        new_midpoint = self.get_surface_midpoint(draw_surface)
-        # find series of translation vectors to center new surface on absolute position of current sprite
-        new_to_original = Vector.vector_from_points(new_midpoint, self.surface_midpoint)
-        original_to_target = Vector.vector_from_points(self.surface_midpoint, self.midpoint)
-        new_to_target = new_to_original + original_to_target
+        new_x, new_y = draw_surface.get_rect().center
+        # translate new surface to original surface, then onto absolute position of current sprite
+        original_x, original_y = self.surface_midpoint.get_coords()
         # absolute position of top left point of sprite
-        location = Point.point_from_vector(new_to_target)
+        location = Point((original_x - new_x) + (midpoint.x - original_x),
+                         (original_y - new_y) + (midpoint.y - original_y))
         return draw_surface, location
 
     def rotate_about_midpoint_ip(self, angle):
@@ -184,7 +246,14 @@ class BugSprite(Polygon):
 
     def pointing_vector(self):
         # funny joke that is a reference to the poynting vector
-        return Vector(-math.sin(self.angle), -math.cos(self.angle))
+        return Vector(*self.pointing_components())
+
+    def pointing_components(self):
+        """Returns x, y components of pointing vector, sin and cos are only recomputed when the angle changes"""
+        if self.angle != self.pointing_angle:
+            self.pointing_angle = self.angle
+            self.pointing = -math.sin(self.angle), -math.cos(self.angle)
+        return self.pointing
 
     def get_coords(self):
         return self.midpoint.get_coords()
@@ -0,0 +1,51 @@
+import numpy as np
+
+
+class RandomStreams:
+    """
+    Independent numpy random streams of one run, all derived from a single master SeedSequence.
+    A stream is keyed by its purpose and generation (and bug), so what it draws does not depend on the order
+    other streams are used in. Serial, batched, parallel and resumed runs with the same seed draw the same numbers.
+    """
+    purposes = {"ga": 0, "positions": 1, "bugs": 2, "food": 3}
+
+    def __init__(self, seed=None):
+        """
+        :int seed: Master seed, or a SeedSequence such as one spawned for an island, fresh entropy from the OS if None
+        """
+        sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.seed = sequence.entropy
+        # streams of a spawned sequence are keyed below its own spawn key
+        self.spawn_key = tuple(sequence.spawn_key)
+
+    def sequence(self, purpose, generation):
+        """
+        :str purpose: One of RandomStreams.purposes
+        :int generation: Generation the stream is used in
+        :return: SeedSequence of the stream
+        """
+        return np.random.SeedSequence(self.seed,
+                                      spawn_key=self.spawn_key + (RandomStreams.purposes[purpose], generation))
+
+    def generator(self, purpose, generation):
+        return np.random.default_rng(self.sequence(purpose, generation))
+
+    def ga(self, generation):
+        """Stream of the genetic algorithm breeding the children of generation"""
+        return self.generator("ga", generation)
+
+    def positions(self, generation):
+        """Stream of starting positions and angles of generation"""
+        return self.generator("positions", generation)
+
+    def food(self, generation):
+        """Stream of food spawned during generation"""
+        return self.generator("food", generation)
+
+    def bugs(self, generation, num_bugs):
+        """
+        :int generation: Generation the bugs belong to
+        :int num_bugs: Number of bugs
+        :return: List of one Generator per bug of generation
+        """
+        return [np.random.default_rng(sequence) for sequence in self.sequence("bugs", generation).spawn(num_bugs)]
@@ -0,0 +1,156 @@
+"""
+Hyperparameter sweeps over ExperimentConfig settings. Every configuration runs as a headless Experiment for a fixed
+number of generations on a pool of worker processes that is reused across configurations, and the max, mean and
+median fitness of every generation is written to a csv table.
+
+    python sweep.py spec.json [--generations 20] [--workers 4] [--output sweep_results.csv]
+
+A spec is a JSON object:
+
+    {
+        "mode": "grid",                 grid (every combination) or random (samples random combinations)
+        "samples": 20,                  number of configurations of a random search
+        "seed": 0,                      seed of the random search
+        "base": {"num_bugs": 200},      settings shared by every configuration
+        "params": {                     settings to sweep
+            "noise_rate": [0.005, 0.009, 0.015],
+            "noise_sd": {"low": 0.05, "high": 0.5, "log": true},
+            "architecture": [[{"inputs": 6, "outputs": 5, "activation": "relu"}, ...], ...]
+        }
+    }
+
+Lists are the values of a grid, and are chosen from uniformly by a random search.
+{"low", "high", "log"} ranges are only supported by random search, sampled uniformly (log-uniformly if log).
+"""
+import os
+import csv
+import sys
+import json
+import itertools
+import numpy as np
+from dataclasses import fields
+from multiprocessing import Pool
+from config import ExperimentConfig
+
+
+def run_configuration(task):
+    """
+    Worker entry point, runs one configuration of a sweep
+    :(int, dict, int) task: Index of configuration, ExperimentConfig settings, number of generations
+    :return: Index of configuration and list of max, mean and median fitness of each generation
+    """
+    # imported by the worker on its first task only, later tasks reuse the loaded modules
+    from experiment import Experiment
+    index, settings, generations = task
+    # configurations run quietly and without a stats csv unless their settings ask for them
+    settings = {"stats_path": None, "verbose": False, **settings}
+    if settings["stats_path"] is not None:
+        # one csv per configuration, e.g. bug_stats_3.csv
+        root, extension = os.path.splitext(settings["stats_path"])
+        settings["stats_path"] = f"{root}_{index}{extension}"
+    experiment = Experiment(ExperimentConfig(**settings))
+    return index, experiment.run(generations)
+
+
+class Sweep:
+    modes = ("grid", "random")
+
+    @staticmethod
+    def grid(params):
+        """
+        :dict params: List of values of each setting
+        :return: List of settings of every combination of values
+        """
+        names = list(params)
+        for name in names:
+            if not isinstance(params[name], list):
+                raise Exception(f"Grid search needs a list of values for {name}.")
+        return [dict(zip(names, values)) for values in itertools.product(*(params[name] for name in names))]
+
+    @staticmethod
+    def random(params, num_samples, rng):
+        """
+        :dict params: List of values, or {"low", "high", "log"} range, of each setting
+        :int num_samples: Number of configurations
+        :np.random.Generator rng: Stream values are drawn from
+        :return: List of settings of num_samples random combinations of values
+        """
+        configurations = []
+        for _ in range(num_samples):
+            settings = {}
+            for name, values in params.items():
+                if isinstance(values, list):
+                    settings[name] = values[rng.integers(0, len(values))]
+                elif values.get("log", False):
+                    settings[name] = float(np.exp(rng.uniform(np.log(values["low"]), np.log(values["high"]))))
+                else:
+                    settings[name] = float(rng.uniform(values["low"], values["high"]))
+            configurations.append(settings)
+        return configurations
+
+    @staticmethod
+    def configurations(spec):
+        """
+        :dict spec: Sweep spec, see module docstring
+        :return: List of ExperimentConfig settings of every configuration, base settings included
+        """
+        mode = spec.get("mode", "grid")
+        if mode not in Sweep.modes:
+            raise Exception(f"Unknown sweep mode {mode}, choose from {Sweep.modes}.")
+        base, params = spec.get("base", {}), spec["params"]
+        known = {field.name for field in fields(ExperimentConfig)}
+        for name in list(base) + list(params):
+            if name not in known:
+                raise Exception(f"Unknown setting {name}, choose from {sorted(known)}.")
+        if mode == "grid":
+            swept = Sweep.grid(params)
+        else:
+            swept = Sweep.random(params, spec.get("samples", 10), np.random.default_rng(spec.get("seed")))
+        return [{**base, **settings} for settings in swept]
+
+    def __init__(self, spec, generations, workers, output="sweep_results.csv"):
+        """
+        :dict spec: Sweep spec, see module docstring
+        :int generations: Number of generations every configuration runs for
+        :int workers: Number of worker processes, each runs one configuration at a time
+        :str output: Path of csv results table
+        """
+        self.spec = spec
+        self.params = list(spec["params"])
+        self.configurations = Sweep.configurations(spec)
+        self.generations = generations
+        self.workers = workers
+        self.output = output
+
+    def run(self):
+        """
+        Runs every configuration, rows of the results table are written as each configuration finishes
+        :return: dict of index of configuration to its list of per-generation stats
+        """
+        results = {}
+        tasks = [(index, settings, self.generations) for index, settings in enumerate(self.configurations)]
+        with open(self.output, 'w') as file, Pool(self.workers) as pool:
+            csv_writer = csv.writer(file, delimiter=',', lineterminator='\n')
+            csv_writer.writerow(["config", *self.params, "generation", "best", "mean", "median"])
+            for index, history in pool.imap_unordered(run_configuration, tasks):
+                settings = self.configurations[index]
+                # lists such as architectures are written as JSON
+                values = [json.dumps(settings[name]) if isinstance(settings[name], (list, dict)) else settings[name]
+                          for name in self.params]
+                for stats in history:
+                    csv_writer.writerow([index, *values, stats["generation"],
+                                         stats["max"], stats["mean"], stats["median"]])
+                file.flush()
+                results[index] = history
+                print(f"Configuration {index} ({len(results)}/{len(tasks)}) "
+                      f"best fitness: {max(stats['max'] for stats in history)}")
+        return results
+
+
+if __name__ == "__main__":
+    with open(sys.argv[1]) as spec_file:
+        sweep_spec = json.load(spec_file)
+    sweep_generations = int(sys.argv[sys.argv.index("--generations") + 1]) if "--generations" in sys.argv else 20
+    sweep_workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else 4
+    sweep_output = sys.argv[sys.argv.index("--output") + 1] if "--output" in sys.argv else "sweep_results.csv"
+    Sweep(sweep_spec, sweep_generations, sweep_workers, sweep_output).run()
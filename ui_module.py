@@ -1,5 +1,6 @@
 import pygame
 from abc import ABC, abstractmethod
+from utility import LRUCache
 
 class UI:
     def __init__(self, x, y, width, height, border_width=3, border_colour=(0, 255, 0), background_colour=(0, 0, 0)):
@@ -20,19 +21,22 @@ class UI:
         pygame.draw.rect(self.surface, self.border_colour, self.border_rect, width=3)
 
     def update(self, bucket_names, ui_dict):
-        # clear background
-        self.refresh_entire_surface()
-
-        # obtain surfaces of UI elements for blitting
-        to_blit = []
-
-        # only update buckets from bucket_names
+        # only update buckets from bucket_names, keeping elements whose display changed
+        dirty_elements = []
         for bucket_name in bucket_names:
             for ui_element in self.ui_buckets[bucket_name]:
                 ui_element.update(ui_dict)
-                to_blit.append(ui_element.draw())
-
-        self.surface.blits(to_blit)
+                if ui_element.is_dirty:
+                    dirty_elements.append(ui_element)
+        if not dirty_elements:
+            return
+
+        # clear background behind changed elements only, border may run underneath them
+        for ui_element in dirty_elements:
+            self.surface.fill(self.background_colour, ui_element.get_rect())
+            ui_element.is_dirty = False
+        pygame.draw.rect(self.surface, self.border_colour, self.border_rect, width=3)
+        self.surface.blits([ui_element.draw() for ui_element in dirty_elements], doreturn=False)
 
     def draw(self):
         return self.surface, self.location
@@ -55,14 +59,39 @@ class UI:
 
 class UI_element(ABC):
     """Generic template for a UI element to be placed on the UI object"""
+    # rendered strings shared by all elements, keyed by font, text and colours
+    text_cache = LRUCache(1024)
+
     def __init__(self, x, y, width, height, to_display=True):
         self.location = x, y # relative to UI surface
         self.width, self.height = width, height
         self.surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        # text currently on surface, element needs to be recomposited onto the UI when dirty
+        self.text = None
+        self.is_dirty = True
 
     def draw(self):
         return self.surface, self.location
 
+    def get_rect(self):
+        return pygame.Rect(self.location, (self.width, self.height))
+
+    def render_text(self, text, font, font_colour, background_colour):
+        """
+        Draws text onto the element surface, skipped if the text is already displayed
+        :str text: Text to display
+        :pygame.font.Font font: Font to render text with
+        :(int, int, int) font_colour: Colour of text
+        :(int, int, int) background_colour: Colour behind text
+        """
+        if text == self.text:
+            return
+        text_surface = UI_element.text_cache.get((font, text, font_colour, background_colour),
+                                                 lambda: font.render(text, True, font_colour, background_colour))
+        self.surface.blit(text_surface, (0, 0))
+        self.text = text
+        self.is_dirty = True
+
     @abstractmethod
     def update(self, kwargs):
         pass
@@ -79,8 +108,7 @@ class UI_fps(UI_element):
 
     def update(self, kwargs):
         fps = f"{self.clock.get_fps():.2f}" # string to print to surface
-        fps_surface = self.font.render(fps, True, self.font_colour, self.background_colour)
-        self.surface.blit(fps_surface, (0, 0))
+        self.render_text(fps, self.font, self.font_colour, self.background_colour)
 
 
 class UI_status(UI_element):
@@ -101,12 +129,11 @@ class UI_status(UI_element):
 
         # generate surface with status
         if self.is_running_genetic_algo:
-            status_surface = self.font.render(f"Generating generation: {generation: >2}",
-                                              True, self.font_colour, self.background_colour)
+            self.render_text(f"Generating generation: {generation: >2}",
+                             self.font, self.font_colour, self.background_colour)
         else:
-            status_surface = self.font.render(f"Running generation: {generation: >2}   ",
-                                              True, self.font_colour, self.background_colour)
-        self.surface.blit(status_surface, (0, 0))
+            self.render_text(f"Running generation: {generation: >2}   ",
+                             self.font, self.font_colour, self.background_colour)
 
 
 class UI_alive(UI_element):
@@ -121,9 +148,7 @@ class UI_alive(UI_element):
     def update(self, kwargs):
         num_dead = kwargs['num_dead']
         num_alive = self.original_alive - num_dead
-        alive_surface = self.font.render(f"Num alive: {num_alive: >3}",
-                                         True, self.font_colour, self.background_colour)
-        self.surface.blit(alive_surface, (0, 0))
+        self.render_text(f"Num alive: {num_alive: >3}", self.font, self.font_colour, self.background_colour)
 
 
 class UI_fitness(UI_element):
@@ -136,8 +161,39 @@ class UI_fitness(UI_element):
 
     def update(self, kwargs):
         fitness = kwargs['fitness']
-        fitness_surface = self.font.render(f"Current max fitness: {fitness: >5}",
-                                           True, self.font_colour, self.background_colour)
-        self.surface.blit(fitness_surface, (0, 0))
+        self.render_text(f"Current max fitness: {fitness: >5}", self.font, self.font_colour, self.background_colour)
 
 
+class UI_profile(UI_element):
+    """Displays rolling mean, p95 and max time of every profiled phase, one phase per line"""
+    def __init__(self, x, y, width, height, font_colour, font, profiler, refresh=30, background_colour=(0, 0, 0)):
+        """
+        :Profiler profiler: Profiler whose phases are displayed
+        :int refresh: Number of updates between refreshes of the displayed stats
+        """
+        self.font_colour = font_colour
+        self.background_colour = background_colour
+        self.font = font
+        self.profiler = profiler
+        self.refresh = refresh
+        self.num_updates = 0
+        super().__init__(x, y, width, height)
+
+    def update(self, kwargs):
+        self.num_updates += 1
+        if (self.num_updates - 1) % self.refresh:
+            return
+        lines = [f"{phase[:17]: <17} {stats['mean'] * 1000: >6.2f} {stats['p95'] * 1000: >6.2f} "
+                 f"{stats['max'] * 1000: >6.2f}" for phase, stats in self.profiler.stats().items()]
+        text = "\n".join(["phase (ms)         mean    p95    max"] + lines)
+        if text == self.text:
+            return
+        self.surface.fill(self.background_colour)
+        line_height = self.font.get_linesize()
+        for line_number, line in enumerate(text.split("\n")):
+            line_surface = UI_element.text_cache.get(
+                (self.font, line, self.font_colour, self.background_colour),
+                lambda: self.font.render(line, True, self.font_colour, self.background_colour))
+            self.surface.blit(line_surface, (0, line_number * line_height))
+        self.text = text
+        self.is_dirty = True
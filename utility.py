@@ -1,4 +1,5 @@
 import math
+from collections import OrderedDict
 
 
 class Direction:
@@ -19,6 +20,50 @@ def manhattan_distance(a, b):
     bx, by = b
     return abs(ax - bx + ay - by)
 
+class LRUCache:
+    """Mapping holding items of total weight at most max_size, the least recently used item is evicted first"""
+    def __init__(self, max_size, weigh=None):
+        """
+        :int max_size: Maximum total weight of cached items
+        :Callable weigh: Weight of an item, e.g. its size in bytes, every item weighs 1 if None
+        """
+        self.max_size = max_size
+        self.weigh = weigh
+        self.items = OrderedDict()
+        self.weights = {}
+        self.total_weight = 0
+
+    def get(self, key, factory):
+        """
+        :key: Hashable key of item
+        :Callable factory: Creates the item if it is not cached
+        :return: Cached item of key
+        """
+        item = self.items.get(key)
+        if item is not None:
+            self.items.move_to_end(key)
+            return item
+        item = self.items[key] = factory()
+        self.weights[key] = 1 if self.weigh is None else self.weigh(item)
+        self.total_weight += self.weights[key]
+        # the newest item is kept even if it is heavier than max_size on its own
+        while self.total_weight > self.max_size and len(self.items) > 1:
+            evicted_key, _ = self.items.popitem(last=False)
+            self.total_weight -= self.weights.pop(evicted_key)
+        return item
+
+    def clear(self):
+        self.items.clear()
+        self.weights.clear()
+        self.total_weight = 0
+
+    def __contains__(self, key):
+        return key in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+
 class Line:
     def __init__(self, point_1, point_2):
         """
@@ -46,12 +91,16 @@ class Line:
                     self.point_2.rotate_about(angle, origin))
 
     def rotate_about_ip(self, angle, origin):
-        self.point_1.rotate_about_ip(angle, origin)
-        self.point_2.rotate_about_ip(angle, origin)
+        # both endpoints share one sin/cos
+        cos_angle, sin_angle = math.cos(angle), math.sin(angle)
+        self.point_1.rotate_about_cs_ip(cos_angle, sin_angle, origin.x, origin.y)
+        self.point_2.rotate_about_cs_ip(cos_angle, sin_angle, origin.x, origin.y)
         self.midpoint = (self.point_1 + self.point_2) / 2
 
 
 class Point:
+    __slots__ = ("x", "y")
+
     @classmethod
     def point_from_vector(cls, vector):
         return cls(*vector.get_components())
@@ -62,6 +111,9 @@ class Point:
     def get_coords(self):
         return self.x, self.y
 
+    def set_coords(self, x, y):
+        self.x, self.y = x, y
+
     def translate_by(self, vector):
         return Point(self.x + vector.x, self.y + vector.y)
 
@@ -69,29 +121,43 @@ class Point:
         self.x += vector.x
         self.y += vector.y
 
+    def translate_along_ip(self, direction_x, direction_y, distance):
+        """
+        Translates point in place by distance along a direction, fused version of translate_by_ip(direction * distance)
+        :float direction_x: x component of direction
+        :float direction_y: y component of direction
+        :float distance: Distance to move along direction
+        """
+        self.x += direction_x * distance
+        self.y += direction_y * distance
+
     def rotate_about(self, angle, origin):
-        position_vector = Vector.vector_from_points(origin, self)
-        position_vector.rotate_ip(angle)
-        return origin.translate_by(position_vector)
+        rotated = Point(self.x, self.y)
+        rotated.rotate_about_cs_ip(math.cos(angle), math.sin(angle), origin.x, origin.y)
+        return rotated
 
     def rotate_about_ip(self, angle, origin):
-        position_vector = Vector.vector_from_points(origin, self)
-        position_vector.rotate_ip(angle)
-        origin = origin.translate_by(position_vector)
-        self.x, self.y = origin.get_coords()
+        self.rotate_about_cs_ip(math.cos(angle), math.sin(angle), origin.x, origin.y)
+
+    def rotate_about_cs_ip(self, cos_angle, sin_angle, origin_x, origin_y):
+        """
+        Rotates point in place with a precomputed cos and sin, so many points can share one angle
+        :float cos_angle: Cosine of angle to rotate by
+        :float sin_angle: Sine of angle to rotate by
+        :float origin_x: x coordinate of centre of rotation
+        :float origin_y: y coordinate of centre of rotation
+        """
+        position_x, position_y = self.x - origin_x, self.y - origin_y
+        self.x = origin_x + (position_x * cos_angle - position_y * sin_angle)
+        self.y = origin_y + (position_x * sin_angle + position_y * cos_angle)
 
     def rotate_about_coords(self, angle, origin=(0, 0)):
-        origin = Point(*origin)
-        position_vector = Vector.vector_from_points(origin, self)
-        position_vector.rotate_ip(angle)
-        return origin.translate_by(position_vector)
+        rotated = Point(self.x, self.y)
+        rotated.rotate_about_cs_ip(math.cos(angle), math.sin(angle), *origin)
+        return rotated
 
     def rotate_about_coords_ip(self, angle, origin=(0, 0)):
-        origin = Point(*origin)
-        position_vector = Vector.vector_from_points(origin, self)
-        position_vector.rotate_ip(angle)
-        origin = origin.translate_by(position_vector)
-        self.x, self.y = origin.get_coords()
+        self.rotate_about_cs_ip(math.cos(angle), math.sin(angle), *origin)
 
     def __str__(self):
         return f"({self.x}, {self.y})"
@@ -110,6 +176,8 @@ class Point:
 
 
 class Vector:
+    __slots__ = ("x", "y")
+
     @staticmethod
     def magnitude_by_components(x, y):
         return math.sqrt(x ** 2 + y ** 2)